@@ -1,4 +1,4 @@
-import { useEffect, useMemo, useState } from 'react';
+import { useEffect, useMemo, useRef, useState } from 'react';
 import {
   Table,
   TableHeader,
@@ -43,57 +43,128 @@ interface Candidate {
   };
 }
 
+interface CandidatePage {
+  items: Candidate[];
+  next: string | null;
+}
+
+interface FacetCount {
+  value: string;
+  count: number;
+}
+
+interface Facets {
+  total: number;
+  primaryProfession: FacetCount[];
+  seniority: FacetCount[];
+  location: FacetCount[];
+}
+
+const PAGE_SIZE = 100;
+const SEARCH_LIMIT = 200;
+const SEARCH_DEBOUNCE_MS = 250;
+
 function App() {
   const [candidates, setCandidates] = useState<Candidate[]>([]);
-  const [jobs, setJobs] = useState<string[]>([]);
+  const [jobs, setJobs] = useState<FacetCount[]>([]);
   const [jobFilter, setJobFilter] = useState('');
   const [searchQuery, setSearchQuery] = useState('');
+  const [searchResults, setSearchResults] = useState<Candidate[] | null>(null);
   const [sortConfig, setSortConfig] = useState<{ key: keyof Candidate[1]['candidate'] | 'skills'; direction: 'ascending' | 'descending' } | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingPage, setLoadingPage] = useState(false);
+  const pageRequest = useRef<AbortController | null>(null);
 
-  useEffect(() => {
-    fetch('/api/candidates')
+  // Name and job sorting is done by the server so paging stays consistent;
+  // skills are sorted client-side over the rows loaded so far.
+  const serverSort = sortConfig && sortConfig.key !== 'skills' ? sortConfig : null;
+  const serverSortKey = serverSort ? serverSort.key : 'id';
+  const serverSortOrder = serverSort && serverSort.direction === 'descending' ? 'desc' : 'asc';
+
+  const loadPage = (cursor: string | null) => {
+    const params = new URLSearchParams({
+      limit: String(PAGE_SIZE),
+      sort: serverSortKey,
+      order: serverSortOrder,
+    });
+    if (jobFilter) {
+      params.set('primary_profession', jobFilter);
+    }
+    if (cursor) {
+      params.set('after', cursor);
+    }
+    // Only the latest request may update the list: a page of the previous
+    // sort or filter arriving late would otherwise replace or extend it.
+    pageRequest.current?.abort();
+    const controller = new AbortController();
+    pageRequest.current = controller;
+    setLoadingPage(true);
+    return fetch(`/api/candidates?${params}`, { signal: controller.signal })
       .then((res) => res.json())
-      .then((data) => {
-        setCandidates(data);
+      .then((data: CandidatePage) => {
+        if (controller.signal.aborted) {
+          return;
+        }
+        setCandidates((prev) => (cursor ? [...prev, ...data.items] : data.items));
+        setNextCursor(data.next);
+      })
+      .catch(() => {})
+      .finally(() => {
+        if (pageRequest.current === controller) {
+          setLoadingPage(false);
+        }
       });
+  };
+
+  // The job filter is applied by the server too, so every page holds only
+  // matching candidates and the facet counts line up with what can be loaded.
+  useEffect(() => {
+    loadPage(null);
+  }, [serverSortKey, serverSortOrder, jobFilter]);
 
-    fetch('/api/jobs')
+  useEffect(() => {
+    fetch('/api/facets')
       .then((res) => res.json())
-      .then((data) => setJobs(data));
+      .then((data: Facets) => setJobs(data.primaryProfession));
   }, []);
 
+  // Searching is done by the server's trigram index, so results cover every
+  // candidate rather than only the pages loaded so far.
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setSearchResults(null);
+      return;
+    }
+    const controller = new AbortController();
+    const timer = setTimeout(() => {
+      fetch(`/api/search?${new URLSearchParams({ q: query, limit: String(SEARCH_LIMIT) })}`, {
+        signal: controller.signal,
+      })
+        .then((res) => res.json())
+        .then((data: { items: Candidate[] }) => setSearchResults(data.items))
+        .catch(() => {});
+    }, SEARCH_DEBOUNCE_MS);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [searchQuery]);
+
   const filteredCandidates = useMemo(() => {
-    let filtered = candidates;
+    let filtered = searchResults ?? candidates;
 
-    if (jobFilter) {
+    // Search results come back unfiltered; loaded pages already are.
+    if (jobFilter && searchResults !== null) {
       filtered = filtered.filter(
         (candidate) => candidate[1].candidate.primaryProfession === jobFilter
       );
     }
 
-    if (searchQuery) {
-      filtered = filtered.filter((candidate) =>
-        Object.values(candidate[1].candidate).some((value) =>
-          String(value).toLowerCase().includes(searchQuery.toLowerCase())
-        ) ||
-        candidate[1].skills.some((skill) =>
-          skill.name.toLowerCase().includes(searchQuery.toLowerCase())
-        )
-      );
-    }
-
-    if (sortConfig !== null) {
-      filtered.sort((a, b) => {
-        let aValue: string | number;
-        let bValue: string | number;
-
-        if (sortConfig.key === 'skills') {
-          aValue = a[1].skills.map((s) => s.name).join(', ');
-          bValue = b[1].skills.map((s) => s.name).join(', ');
-        } else {
-          aValue = a[1].candidate[sortConfig.key];
-          bValue = b[1].candidate[sortConfig.key];
-        }
+    if (sortConfig !== null && sortConfig.key === 'skills') {
+      filtered = [...filtered].sort((a, b) => {
+        const aValue = a[1].skills.map((s) => s.name).join(', ');
+        const bValue = b[1].skills.map((s) => s.name).join(', ');
 
         if (aValue < bValue) {
           return sortConfig.direction === 'ascending' ? -1 : 1;
@@ -106,7 +177,7 @@ function App() {
     }
 
     return filtered;
-  }, [jobFilter, searchQuery, candidates, sortConfig]);
+  }, [jobFilter, searchResults, candidates, sortConfig]);
 
   const requestSort = (key: keyof Candidate[1]['candidate'] | 'skills') => {
     let direction: 'ascending' | 'descending' = 'ascending';
@@ -137,9 +208,9 @@ function App() {
               </SelectTrigger>
               <SelectContent>
                 <SelectItem value="all">All Jobs</SelectItem>
-                {jobs.map((job) => (
-                  <SelectItem key={job} value={job}>
-                    {job}
+                {jobs.filter((job) => job.value).map((job) => (
+                  <SelectItem key={job.value} value={job.value}>
+                    {job.value} ({job.count})
                   </SelectItem>
                 ))}
               </SelectContent>
@@ -211,6 +282,13 @@ function App() {
               ))}
             </TableBody>
           </Table>
+          {nextCursor && searchResults === null && (
+            <div className="flex justify-center mt-4">
+              <Button onClick={() => loadPage(nextCursor)} variant="outline" disabled={loadingPage}>
+                {loadingPage ? 'Loading...' : 'Load more'}
+              </Button>
+            </div>
+          )}
         </CardContent>
       </Card>
     </div>
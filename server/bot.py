@@ -1,76 +1,277 @@
 import argparse
-import json
-import os
+import queue
+import threading
 import time
-import requests
+from collections import Counter
 import config
-from card_utils import format_card
-from db_utils import Database
+from card_utils import format_card, format_digest
+from db_utils import Database, NEW_CANDIDATE_CHANNEL
+from routing_utils import RoutingMatcher, load_routing_rules
+from telegram_utils import TelegramError, TelegramSender
+
+class DeliveryMetrics:
+    """Counters for one chat's deliveries since the bot started."""
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.retrying = 0
+        self.send_seconds = 0.0
+        self.last_sent_at = None
+        self.last_error = None
+
+    def record(self, status, seconds, error=None):
+        self.send_seconds += seconds
+        if status == "sent":
+            self.sent += 1
+            self.last_sent_at = time.time()
+        else:
+            self.last_error = error
+            if status == "failed":
+                self.failed += 1
+            else:
+                self.retrying += 1
+
+    def summary(self):
+        attempts = self.sent + self.failed + self.retrying
+        average = self.send_seconds / attempts if attempts else 0.0
+        return (f"sent {self.sent}, failed {self.failed}, retried {self.retrying}, "
+                f"{average:.2f}s per card")
+
+
+class ChatWorker(threading.Thread):
+    """Delivers one chat's queue in cv_deliveries.
+
+    Every destination chat has its own worker and rate limit, so a chat that
+    is throttled or slow to answer only holds up its own cards.
+    """
+
+    def __init__(self, bot, chat_id):
+        super().__init__(name=f"chat-{chat_id}", daemon=True)
+        self.bot = bot
+        self.chat_id = chat_id
+        self.metrics = DeliveryMetrics()
+        self.digests = queue.Queue()
+        self.wakeup = threading.Event()
+
+    def run(self):
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            try:
+                while not self.digests.empty():
+                    digest = self.digests.get()
+                    print(f"[{self.chat_id}] Sending backlog digest: {digest}")
+                    self.bot.wait_for_card(self.bot.sender.submit(self.chat_id, digest))
+                self.bot.deliver(self.chat_id, self.metrics)
+            except Exception as e:
+                print(f"[{self.chat_id}] Error during delivery: {e}")
+
+
+BACKLOG_POLICIES = ("all", "digest", "skip")
 
 class Bot:
-    def __init__(self, db):
+    def __init__(self, db, sender=None, rules=None):
+        if config.BACKLOG_POLICY not in BACKLOG_POLICIES:
+            raise ValueError(f"Unknown BACKLOG_POLICY: {config.BACKLOG_POLICY}")
         self.db = db
+        if rules is None:
+            rules = load_routing_rules(config.ROUTING_RULES_FILE, config.TELEGRAM_CHAT_ID)
+        self.matcher = RoutingMatcher(rules)
+        self.sender = sender or TelegramSender(
+            config.TELEGRAM_BOT_TOKEN,
+            api_url=config.TELEGRAM_API_URL,
+            global_rate=config.TELEGRAM_GLOBAL_RATE,
+            chat_rate=config.TELEGRAM_CHAT_RATE,
+            group_rate_per_minute=config.TELEGRAM_GROUP_RATE_PER_MINUTE,
+            # Each chat worker keeps one request in flight.
+            max_concurrency=max(config.TELEGRAM_MAX_CONCURRENCY, len(self.matcher.chats)),
+            max_retries=config.TELEGRAM_MAX_RETRIES,
+            timeout=config.TELEGRAM_TIMEOUT,
+        )
+        for chat_id, options in self.matcher.chat_options.items():
+            if "rate_per_minute" in options:
+                self.sender.set_chat_rate(chat_id, options["rate_per_minute"] / 60.0)
+        self.workers = {chat_id: ChatWorker(self, chat_id) for chat_id in self.matcher.chats}
 
     def send_card(self, message):
-        url = f"https://api.telegram.org/bot{config.TELEGRAM_BOT_TOKEN}/sendMessage"
-        resp = requests.post(url, data={
-            "chat_id": config.TELEGRAM_CHAT_ID,
-            "text": message,
-            "parse_mode": "Markdown"
-        })
-        if not resp.ok:
-            print(f"Failed to send message: {resp.text}")
-
-    def load_last_sent_id(self):
-        if os.path.exists(config.TRACK_FILE):
-            with open(config.TRACK_FILE, "r") as f:
-                return json.load(f).get("last_id", 0)
-        return 0
-
-    def save_last_sent_id(self, last_id):
-        with open(config.TRACK_FILE, "w") as f:
-            json.dump({"last_id": last_id}, f)
+        return self.wait_for_card(self.submit_card(message))
+
+    def submit_card(self, message):
+        return self.sender.submit(config.TELEGRAM_CHAT_ID, message)
+
+    def wait_for_card(self, future):
+        """Return the sent Message, or None after printing why it failed."""
+        try:
+            return future.result()
+        except TelegramError as e:
+            print(f"Failed to send message: {e}")
+            return None
+
+    def trim_backlog(self):
+        """Apply BACKLOG_POLICY to the candidates about to be routed.
+
+        If more than BACKLOG_MAX are queued in cv_deliveries_to_route, all
+        but the newest BACKLOG_MAX are taken off the queue. Returns
+        {chat_id: digest} for the skipped ones (empty unless the policy is
+        'digest').
+        """
+        if config.BACKLOG_POLICY == "all":
+            return {}
+        keep = max(1, config.BACKLOG_MAX)
+        total, first_id, cutoff_id = self.db.fetch_backlog(keep)
+        if cutoff_id is None:
+            return {}
+        print(f"Backlog of {total} candidates is over BACKLOG_MAX ({keep}); "
+              f"skipping the oldest {total - keep} (ids {first_id}-{cutoff_id}).")
+        digests = {}
+        if config.BACKLOG_POLICY == "digest":
+            # The skipped candidates are still matched, so each chat's digest
+            # counts only the candidates it would have been sent. Rows come
+            # in id order: the first one seen for a chat is its lowest id.
+            skipped = {}
+            for row in self.db.iter_routing_rows(cutoff_id):
+                for chat_id in self.matcher.route(row):
+                    counts = skipped.setdefault(chat_id, {"total": 0, "first_id": row[0], "professions": Counter()})
+                    counts["total"] += 1
+                    counts["last_id"] = row[0]
+                    counts["professions"][row[1]] += 1
+            for chat_id, counts in skipped.items():
+                professions = sorted(counts["professions"].items(), key=lambda item: (-item[1], item[0] or ""))
+                digests[chat_id] = format_digest(counts["total"], professions, counts["first_id"], counts["last_id"])
+        self.db.skip_routing(cutoff_id)
+        return digests
+
+    def route_new_candidates(self):
+        """Queue every candidate waiting in cv_deliveries_to_route in
+        cv_deliveries, once for each chat whose routing rules it matches.
+        Returns the number of candidates routed."""
+        for chat_id, digest in self.trim_backlog().items():
+            if chat_id in self.workers:
+                self.workers[chat_id].digests.put(digest)
+        routed = 0
+        while True:
+            batch = self.db.route_candidates(self.matcher.route, config.ROUTING_BATCH_SIZE)
+            if not batch:
+                return routed
+            routed += batch
+
+    def send_new_candidates(self):
+        """Route new candidates and wake every chat's worker to deliver the
+        cards that are due."""
+        routed = self.route_new_candidates()
+        if routed:
+            print(f"Routed {routed} new candidates to {len(self.workers)} chats.")
+        for worker in self.workers.values():
+            if not worker.is_alive():
+                worker.start()
+            worker.wakeup.set()
+
+    def deliver(self, chat_id, metrics):
+        """Send every due card queued for chat_id, one at a time."""
+        # Claims are paged, so however long the queue only one batch of CVs
+        # is in memory, and each batch is committed before the next.
+        while True:
+            claimed = self.db.claim_deliveries(chat_id, config.OUTBOX_BATCH_SIZE, config.OUTBOX_LEASE_SECONDS)
+            if not claimed:
+                return
+            results = []
+            held = {candidate_id for candidate_id, _, _ in claimed}
+            renewed_at = time.monotonic()
+            for candidate_id, attempts, data in claimed:
+                if time.monotonic() - renewed_at > config.OUTBOX_LEASE_SECONDS / 2:
+                    # A throttled chat can take longer than the lease to get
+                    # through a batch; renew it, sent cards included until
+                    # they are recorded, so no other sender sends them again.
+                    held = self.db.renew_claims(chat_id, [(c, a) for c, a, _ in claimed if c in held])
+                    renewed_at = time.monotonic()
+                if candidate_id not in held:
+                    continue  # Lease lost: claimed again by another sender.
+                if data is None:
+                    continue  # Deleted since the claim; its delivery row went with it.
+                data["id"] = candidate_id  # Attach DB row id for correct More Info link
+                card = format_card(data)
+                print(f"[{chat_id}] Sending candidate {candidate_id}: {card}")
+                started = time.perf_counter()
+                try:
+                    message = self.sender.send_message(chat_id, card)
+                    result = (chat_id, candidate_id, "sent", message["message_id"], None, 0)
+                except TelegramError as e:
+                    # The sender already retried throttling and server errors;
+                    # anything else (bad Markdown, bot removed from the chat)
+                    # will not get better by itself.
+                    retryable = e.error_code is None or e.error_code == 429 or e.error_code >= 500
+                    if retryable and attempts < config.OUTBOX_MAX_ATTEMPTS:
+                        delay = min(3600, config.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+                        print(f"[{chat_id}] Failed to send candidate {candidate_id} (attempt {attempts}), retrying in {delay}s: {e}")
+                        result = (chat_id, candidate_id, "pending", None, str(e), delay)
+                    else:
+                        print(f"[{chat_id}] Failed to send candidate {candidate_id} (attempt {attempts}), giving up: {e}")
+                        result = (chat_id, candidate_id, "failed", None, str(e), 0)
+                metrics.record(result[2], time.perf_counter() - started, result[4])
+                results.append(result)
+            # One commit per batch. If the bot dies before it, the batch stays
+            # claimed and is sent again once the lease runs out.
+            self.db.record_deliveries(results)
+            print(f"[{chat_id}] {metrics.summary()}")
+
+    def print_delivery_stats(self):
+        print(f"{'Chat':<20} | {'Status':<8} | {'Cards':>8} | Last sent")
+        print("-" * 64)
+        for chat_id, status, count, last_sent_at in self.db.fetch_delivery_stats():
+            print(f"{chat_id:<20} | {status:<8} | {count:>8} | {last_sent_at or '-'}")
 
     def poll_new_candidates(self):
         print(f"Polling every {config.POLL_INTERVAL} seconds for new candidates...")
-        last_sent_id = self.load_last_sent_id()
-        sent_ids = set()
         while True:
             try:
-                rows = self.db.fetch_new_candidates(last_sent_id)
-                for row in rows:
-                    row_id, data = row
-                    data["id"] = row_id  # Attach DB row id for correct More Info link
-                    if row_id in sent_ids:
-                        continue  # Already sent in this session
-                    card = format_card(data)
-                    print(f"Sending candidate {row_id}: {card}")
-                    self.send_card(card)
-                    sent_ids.add(row_id)
-                    last_sent_id = row_id
-                    self.save_last_sent_id(last_sent_id)
+                self.send_new_candidates()
             except Exception as e:
                 print(f"Error during polling: {e}")
             time.sleep(config.POLL_INTERVAL)
 
+    def listen_new_candidates(self):
+        print(f"Listening on '{NEW_CANDIDATE_CHANNEL}' for new candidates "
+              f"(fallback poll every {config.LISTEN_FALLBACK_INTERVAL} seconds)...")
+        while True:
+            try:
+                with self.db.listen(NEW_CANDIDATE_CHANNEL) as listener:
+                    # Catch up on anything inserted while we were not listening.
+                    self.send_new_candidates()
+                    while True:
+                        # The payload is only a wake-up call: routing
+                        # everything in cv_deliveries_to_route also picks up
+                        # notifications we missed, and a timeout doubles as
+                        # the fallback poll (and the retry of failed sends).
+                        listener.wait(config.LISTEN_FALLBACK_INTERVAL)
+                        self.send_new_candidates()
+            except Exception as e:
+                print(f"Error while listening: {e}")
+                time.sleep(config.POLL_INTERVAL)
+
     def send_all_candidates(self, limit=10):
         print(f"Sending all candidates (limit: {limit})...")
         try:
             rows = self.db.fetch_all_candidates(limit=limit)
+            pending = []
             for row in rows:
                 row_id, data = row
                 data["id"] = row_id
                 card = format_card(data)
                 print(f"Sending candidate {row_id}: {card}")
-                self.send_card(card)
+                pending.append(self.submit_card(card))
+            for future in pending:
+                self.wait_for_card(future)
         except Exception as e:
             print(f"Error sending all candidates: {e}")
 
 def main():
     parser = argparse.ArgumentParser(description="Telegram CV Bot")
     parser.add_argument("--poll", action="store_true", help="Poll for new candidates and send them to Telegram.")
+    parser.add_argument("--listen", action="store_true", help="Send new candidates to Telegram as soon as Postgres notifies about them.")
     parser.add_argument("--send-all", action="store_true", help="Send all candidates to Telegram.")
     parser.add_argument("--limit", type=int, default=10, help="Limit the number of candidates to send with --send-all.")
+    parser.add_argument("--delivery-stats", action="store_true", help="Print delivery counts per chat and status.")
     args = parser.parse_args()
 
     db = Database(config.DB_CONFIG)
@@ -82,8 +283,16 @@ def main():
             bot.poll_new_candidates()
         else:
             print("[AutoSend] AUTO_SEND_ENABLED is not set to true. Exiting.")
+    elif args.listen:
+        if config.AUTO_SEND_ENABLED:
+            print("[AutoSend] AUTO_SEND_ENABLED is true. Starting listener...")
+            bot.listen_new_candidates()
+        else:
+            print("[AutoSend] AUTO_SEND_ENABLED is not set to true. Exiting.")
     elif args.send_all:
         bot.send_all_candidates(limit=args.limit)
+    elif args.delivery_stats:
+        bot.print_delivery_stats()
     else:
         parser.print_help()
 
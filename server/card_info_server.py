@@ -4,33 +4,284 @@ import os
 # Add the 'server' directory to the Python path
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
-from flask import Flask, jsonify, render_template
+import base64
+import binascii
+import json
+
+from flask import Flask, Response, abort, jsonify, render_template, request, stream_with_context
+from werkzeug.http import is_resource_modified
 from db_utils import Database
+from index_utils import CandidateCache, ChangeListener, FacetCache, IdIndex, PayloadSnapshot, SkillIndex, bitmap_ids
 import config
 
 app = Flask(__name__)
-db = Database(config.DB_CONFIG)
+if config.DB_POOL_ENABLED:
+    db = Database.pooled(
+        config.DB_CONFIG,
+        min_size=config.DB_POOL_MIN_SIZE,
+        max_size=config.DB_POOL_MAX_SIZE,
+        timeout=config.DB_POOL_TIMEOUT,
+        check_after=config.DB_POOL_CHECK_AFTER,
+    )
+else:
+    db = Database(config.DB_CONFIG)
+
+# Updates and deletes made by other processes (the bot, tools/db scripts,
+# other workers) reach the in-memory caches below through this listener;
+# deletes made here also invalidate them directly via db.delete_listeners.
+changes = ChangeListener(db)
+
+@app.before_request
+def start_change_listener():
+    # After fork the listener thread is gone; start it in each worker.
+    changes.start()
+
+id_index = None
+if config.ID_INDEX_ENABLED:
+    id_index = IdIndex(db, refresh_interval=config.ID_INDEX_REFRESH_INTERVAL, max_age=config.ID_INDEX_MAX_AGE)
+    db.attach_id_index(id_index)
+    changes.subscribe(lambda candidate_id: id_index.invalidate())
+
+facet_cache = FacetCache(db, refresh_interval=config.FACET_REFRESH_INTERVAL, ttl=config.FACET_CACHE_TTL)
+db.delete_listeners.append(facet_cache.invalidate)
+changes.subscribe(lambda candidate_id: facet_cache.invalidate())
+
+skill_index = SkillIndex(db, refresh_interval=config.SKILL_INDEX_REFRESH_INTERVAL, max_age=config.SKILL_INDEX_MAX_AGE)
+db.delete_listeners.append(skill_index.invalidate)
+changes.subscribe(lambda candidate_id: skill_index.invalidate())
+
+candidate_cache = None
+if config.CANDIDATE_CACHE_ENABLED:
+    candidate_cache = CandidateCache(db, changes, max_bytes=config.CANDIDATE_CACHE_MAX_BYTES, ttl=config.CANDIDATE_CACHE_TTL)
+
+candidate_list_snapshot = None
+if config.LIST_SNAPSHOT_ENABLED:
+    candidate_list_snapshot = PayloadSnapshot(db, db.fetch_all_candidates_json, check_interval=config.LIST_SNAPSHOT_CHECK_INTERVAL)
+
+def fetch_candidate(candidate_id):
+    if candidate_cache is not None:
+        return candidate_cache.get(candidate_id)
+    return db.fetch_candidate_by_id(candidate_id)
 
 @app.route('/candidate/<int:candidate_id>')
 def candidate_profile(candidate_id):
-    data = db.fetch_candidate_by_id(candidate_id)
-    if not data:
+    if id_index is not None:
+        # Unknown ids 404 without a query; prev/next come from memory.
+        if not id_index.contains(candidate_id):
+            abort(404)
+        data = fetch_candidate(candidate_id)
+        if not data:
+            id_index.discard(candidate_id)
+            abort(404)
+        return render_template("card_info_ui.html", c=data, nav=db.get_adjacent_candidate_ids(candidate_id))
+
+    # Row and prev/next navigation links come back in one query.
+    result = db.fetch_candidate_with_nav(candidate_id)
+    if not result:
         abort(404)
-        
-    # Get navigation links
-    nav = db.get_adjacent_candidate_ids(candidate_id)
-    
+    data, nav = result
+
     return render_template("card_info_ui.html", c=data, nav=nav)
 
+STREAM_CHUNK_BYTES = 64 * 1024
+
+def stream_json_array(items):
+    # Join already-encoded JSON items into an array, flushing roughly every
+    # STREAM_CHUNK_BYTES.
+    buf = [b"["]
+    size = 1
+    first = True
+    for item in items:
+        if not first:
+            buf.append(b",")
+            size += 1
+        first = False
+        buf.append(item)
+        size += len(item)
+        if size >= STREAM_CHUNK_BYTES:
+            yield b"".join(buf)
+            buf = []
+            size = 0
+    buf.append(b"]")
+    yield b"".join(buf)
+
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(sort, descending, after, primary_profession=None):
+    payload = json.dumps([sort, descending, after[0], after[1], primary_profession], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(token, sort, descending, primary_profession=None):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        token_sort, token_desc, value, last_id, token_profession = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError):
+        abort(400, description="Invalid cursor")
+    if (token_sort != sort or token_desc != descending or token_profession != primary_profession
+            or not isinstance(last_id, int) or isinstance(last_id, bool)):
+        abort(400, description="Cursor does not match the requested sort")
+    # Name and profession sorts compare value against a text column; anything
+    # else would be adapted to some other SQL type and fail in the query.
+    if sort != 'id' and not isinstance(value, str):
+        abort(400, description="Invalid cursor")
+    return (value, last_id)
+
+def api_candidates_page():
+    limit = request.args.get('limit', type=int)
+    if limit is None or not 0 < limit <= MAX_PAGE_SIZE:
+        abort(400, description=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    sort = request.args.get('sort', 'id')
+    if sort not in db.CANDIDATE_SORT_KEYS:
+        abort(400, description=f"Unknown sort key: {sort}")
+    descending = request.args.get('order', 'asc') == 'desc'
+    primary_profession = request.args.get('primary_profession')
+    token = request.args.get('after')
+    after = decode_cursor(token, sort, descending, primary_profession) if token else None
+
+    rows, next_after = db.fetch_candidates_page(
+        limit, after=after, sort=sort, descending=descending, primary_profession=primary_profession)
+    return jsonify({
+        'items': rows,
+        'next': encode_cursor(sort, descending, next_after, primary_profession) if next_after else None,
+    })
+
+SKILL_FILTER_ARGS = ('skills', 'any_skills', 'not_skills')
+
+def skill_list(name):
+    return [skill for skill in request.args.get(name, '').split(',') if skill.strip()]
+
+def api_candidates_by_skills():
+    # skills=a,b (all of), any_skills=c,d (at least one), not_skills=e (none of)
+    matches = skill_index.query(
+        all_of=skill_list('skills'),
+        any_of=skill_list('any_skills'),
+        none_of=skill_list('not_skills'),
+    )
+    limit = request.args.get('limit', type=int)
+    if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+        abort(400, description=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if request.args.get('sort', 'id') != 'id' or request.args.get('order', 'asc') != 'asc':
+        abort(400, description="Skill filters only support sort=id in ascending order")
+    token = request.args.get('after')
+    start = decode_cursor(token, 'id', False)[1] + 1 if token else 0
+
+    # Fetch one extra id to learn whether another page exists.
+    ids = bitmap_ids(matches, start=start, limit=limit + 1 if limit else None)
+    next_token = None
+    if limit and len(ids) > limit:
+        ids = ids[:limit]
+        next_token = encode_cursor('id', False, (None, ids[-1]))
+    return jsonify({
+        'items': db.fetch_candidates_by_ids(ids) if ids else [],
+        'next': next_token,
+        'total': matches.bit_count(),
+    })
+
+def conditional(etag, last_modified, build):
+    """Answer 304 if the client's copy is still current, else call build().
+
+    no-cache makes browsers store the response but revalidate it on every
+    use, so a repeat visit costs one request and no payload.
+    """
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = build()
+    else:
+        response = Response(status=304)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+def snapshot_response(version, changed_at, variants):
+    # Smallest first: on equal client preference the earlier entry wins.
+    offered = [encoding for encoding in ('br', 'gzip', 'identity') if encoding in variants]
+    encoding = request.accept_encodings.best_match(offered, default='identity') or 'identity'
+    # Each encoding is a different representation, so it gets its own tag.
+    etag = f"cv-{version}-snapshot-{encoding}"
+
+    def build():
+        response = Response(variants[encoding], mimetype='application/json')
+        if encoding != 'identity':
+            response.content_encoding = encoding
+        return response
+
+    response = conditional(etag, changed_at, build)
+    response.vary.add('Accept-Encoding')
+    return response
+
 @app.route('/api/candidates')
 def api_candidates():
-    candidates = db.fetch_all_candidates_with_details()
-    return jsonify(candidates)
+    if any(name in request.args for name in SKILL_FILTER_ARGS):
+        # The skill index lags the table, so its answers carry no version.
+        return api_candidates_by_skills()
+    if candidate_list_snapshot is not None and not request.args:
+        snapshot = candidate_list_snapshot.current()
+        if snapshot is not None:
+            return snapshot_response(*snapshot)
+    # Read before the rows: a write landing in between leaves a response
+    # newer than its tag, never older.
+    data_version = db.fetch_data_version()
+    if data_version is None:
+        # No change tracking (tools/db/create_change_tracking.py), no tag.
+        return build_candidates_response()
+    version, changed_at = data_version
+    return conditional(f"cv-{version}", changed_at, build_candidates_response)
+
+def build_candidates_response():
+    if 'limit' in request.args:
+        return api_candidates_page()
+    if config.STREAM_CANDIDATES:
+        items = db.iter_candidates_json(fetch_size=config.STREAM_FETCH_SIZE)
+        return Response(stream_with_context(stream_json_array(items)), mimetype='application/json')
+    # Built as JSON by Postgres and sent as is, never decoded here.
+    return Response(db.fetch_all_candidates_json(), mimetype='application/json')
+
+@app.route('/api/search')
+def api_search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        abort(400, description="q is required")
+    limit = request.args.get('limit', 50, type=int)
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        abort(400, description=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    threshold = request.args.get('threshold', config.SEARCH_SIMILARITY_THRESHOLD, type=float)
+    if not 0 <= threshold <= 1:
+        abort(400, description="threshold must be between 0 and 1")
+
+    return jsonify({'items': db.search_candidates(query, limit=limit, threshold=threshold)})
+
+@app.route('/api/search/fulltext')
+def api_search_fulltext():
+    query = request.args.get('q', '').strip()
+    if not query:
+        abort(400, description="q is required")
+    limit = request.args.get('limit', 20, type=int)
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        abort(400, description=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    return jsonify({'items': db.full_text_search(query, limit=limit)})
 
 @app.route('/api/jobs')
 def api_jobs():
-    jobs = db.fetch_all_jobs()
-    return jsonify(jobs)
+    jobs = facet_cache.values('primaryProfession')
+    # Served from memory, so the tag is a hash of the list itself.
+    response = jsonify(jobs)
+    response.add_etag()
+    response.last_modified = facet_cache.modified_at
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/api/facets')
+def api_facets():
+    return jsonify(facet_cache.facets())
+
+@app.route('/api/pool-stats')
+def api_pool_stats():
+    return jsonify(db.pool_stats())
+
+@app.route('/api/candidate-cache-stats')
+def api_candidate_cache_stats():
+    return jsonify(candidate_cache.stats() if candidate_cache else None)
 
 # The following is for local development only, Vercel will handle serving the React app
 if __name__ == "__main__":
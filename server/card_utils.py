@@ -54,4 +54,22 @@ def format_card(c):
 {exp_block}
 
 🔗 [More Info]({safe_profile_link})
-"""
\ No newline at end of file
+"""
+
+
+def format_digest(total, profession_counts, first_id, last_id):
+    """One message standing in for a backlog of cards that were not sent."""
+    lines = '\n'.join(
+        f"• {profession or 'N/A'}: {count}"
+        for profession, count in profession_counts[:10]
+    )
+    if len(profession_counts) > 10:
+        lines += '\n• ...'
+
+    return f"""📦 *{total} candidates* arrived while the bot was away (ids {first_id}–{last_id}).
+
+*By profession:*
+{lines or 'N/A'}
+
+🔗 [Browse all candidates](http://localhost:5000/)
+"""
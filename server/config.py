@@ -5,6 +5,15 @@ load_dotenv()
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+# Telegram allows about 30 messages per second overall, one per second to a
+# private chat and 20 per minute to a group.
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", 30))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", 1))
+TELEGRAM_GROUP_RATE_PER_MINUTE = float(os.getenv("TELEGRAM_GROUP_RATE_PER_MINUTE", 20))
+TELEGRAM_MAX_CONCURRENCY = int(os.getenv("TELEGRAM_MAX_CONCURRENCY", 8))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", 5))
+TELEGRAM_TIMEOUT = float(os.getenv("TELEGRAM_TIMEOUT", 10))
 
 PORT = int(os.getenv("PORT", 3000))
 NODE_ENV = os.getenv("NODE_ENV", "development")
@@ -17,9 +26,59 @@ DB_CONFIG = {
     "password": os.getenv("DB_PASSWORD")
 }
 
+DB_POOL_ENABLED = os.getenv("DB_POOL_ENABLED", "false").lower() == "true"
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_CHECK_AFTER = float(os.getenv("DB_POOL_CHECK_AFTER", 30))
+
+STREAM_CANDIDATES = os.getenv("STREAM_CANDIDATES", "false").lower() == "true"
+STREAM_FETCH_SIZE = int(os.getenv("STREAM_FETCH_SIZE", 2000))
+
+ID_INDEX_ENABLED = os.getenv("ID_INDEX_ENABLED", "false").lower() == "true"
+ID_INDEX_REFRESH_INTERVAL = float(os.getenv("ID_INDEX_REFRESH_INTERVAL", 5))
+ID_INDEX_MAX_AGE = float(os.getenv("ID_INDEX_MAX_AGE", 300))
+
+FACET_REFRESH_INTERVAL = float(os.getenv("FACET_REFRESH_INTERVAL", 5))
+FACET_CACHE_TTL = float(os.getenv("FACET_CACHE_TTL", 300))
+
+SEARCH_SIMILARITY_THRESHOLD = float(os.getenv("SEARCH_SIMILARITY_THRESHOLD", 0.3))
+
+SKILL_INDEX_REFRESH_INTERVAL = float(os.getenv("SKILL_INDEX_REFRESH_INTERVAL", 5))
+SKILL_INDEX_MAX_AGE = float(os.getenv("SKILL_INDEX_MAX_AGE", 300))
+
+CANDIDATE_CACHE_ENABLED = os.getenv("CANDIDATE_CACHE_ENABLED", "false").lower() == "true"
+CANDIDATE_CACHE_MAX_BYTES = int(os.getenv("CANDIDATE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+CANDIDATE_CACHE_TTL = float(os.getenv("CANDIDATE_CACHE_TTL", 300))
+
+LIST_SNAPSHOT_ENABLED = os.getenv("LIST_SNAPSHOT_ENABLED", "false").lower() == "true"
+LIST_SNAPSHOT_CHECK_INTERVAL = float(os.getenv("LIST_SNAPSHOT_CHECK_INTERVAL", 1))
+
 POLL_INTERVAL = int(os.getenv("POLL_INTERVAL", 60))
+LISTEN_FALLBACK_INTERVAL = int(os.getenv("LISTEN_FALLBACK_INTERVAL", 600))
 AUTO_SEND_ENABLED = os.getenv("AUTO_SEND_ENABLED", "false").lower() == "true"
 
+# Delivery outbox (tools/db/create_outbox_table.py). Results are committed
+# once per batch of OUTBOX_BATCH_SIZE cards; claims not resolved within
+# OUTBOX_LEASE_SECONDS are taken to be from a crashed bot and sent again.
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 20))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", 300))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 5))
+OUTBOX_RETRY_DELAY = int(os.getenv("OUTBOX_RETRY_DELAY", 60))
+# Candidates taken off cv_deliveries_to_route and routed per transaction.
+ROUTING_BATCH_SIZE = int(os.getenv("ROUTING_BATCH_SIZE", 1000))
+
+# What the bot does when more than BACKLOG_MAX candidates arrived while it was
+# down: "all" sends every card, "digest" sends one summary message plus the
+# newest BACKLOG_MAX cards, "skip" sends only the newest BACKLOG_MAX cards.
+BACKLOG_POLICY = os.getenv("BACKLOG_POLICY", "all").lower()
+BACKLOG_MAX = int(os.getenv("BACKLOG_MAX", 100))
+
+# JSON list of routing rules sending candidates to recruiter chats by
+# primaryProfession, seniority, location or skills (see routing_utils.py).
+# Without it every candidate goes to TELEGRAM_CHAT_ID.
+ROUTING_RULES_FILE = os.getenv("ROUTING_RULES_FILE")
+
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
 
 TRACK_FILE = os.path.join(os.path.dirname(__file__), "last_sent_id.json")
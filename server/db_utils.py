@@ -1,13 +1,330 @@
+import html
+import io
 import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+import psycopg2.extras
+import psycopg2.sql
 import os
+import select
+import threading
+import time
+from collections import deque
 from contextlib import contextmanager
 
+
+# Columns of cv_profiles_summary, a narrow copy of the list-view fields kept
+# in sync with cv_profiles by triggers (see tools/db/create_summary_table.py).
+# List reads go through it so they never touch the wide JSONB rows.
+CANDIDATE_SUMMARY_COLUMNS = "id, full_name, primary_profession, location, seniority, department, skill_names"
+
+# The [id, summary] pairs of _summary_row, built by Postgres as JSON.
+CANDIDATE_SUMMARY_JSON = """json_build_array(id, json_build_object(
+    'candidate', json_build_object(
+        'fullName', COALESCE(NULLIF(full_name, ''), 'N/A'),
+        'primaryProfession', COALESCE(NULLIF(primary_profession, ''), 'N/A'),
+        'location', COALESCE(NULLIF(location, ''), 'N/A'),
+        'seniority', COALESCE(NULLIF(seniority, ''), 'N/A'),
+        'department', COALESCE(NULLIF(department, ''), 'N/A')
+    ),
+    'skills', ARRAY(
+        SELECT json_build_object('name', name)
+        FROM unnest(skill_names) WITH ORDINALITY AS s (name, i)
+        ORDER BY i
+    )
+))"""
+
+# Returns json, jsonb and text columns as the UTF-8 bytes Postgres sent,
+# skipping both the str decode and json.loads. Registered per cursor, so other
+# queries on the same (pooled) connection keep the default casters.
+RAW_JSON = psycopg2.extensions.new_type((114, 3802, 25), 'RAW_JSON', psycopg2.extensions.BYTES)
+
+# The cv_profiles_summary fields routing rules match on, in the argument order
+# of RoutingMatcher.match (see routing_utils.py).
+ROUTING_ROW_COLUMNS = "primary_profession, seniority, location, skill_names"
+
+# NOTIFY channel fired once per statement inserting into cv_profiles, with the
+# highest new id (see tools/db/create_notify_triggers.py).
+NEW_CANDIDATE_CHANNEL = "cv_profiles_new"
+
+# NOTIFY channel fired by statements that change cv_profiles data or delete
+# rows, with the old ids comma-separated (several notifications for large
+# statements), and with '*' on TRUNCATE.
+CHANGED_CANDIDATE_CHANNEL = "cv_profiles_changed"
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 connection pool with a bounded min/max size.
+
+    Idle connections are health-checked on checkout. Broken or recycled ones
+    are closed and replaced, so at least min_size stay open. The pool notices
+    when it is used from a forked child (e.g. a gunicorn worker under
+    --preload) and starts over with fresh connections.
+    """
+
+    def __init__(self, db_config, min_size=1, max_size=10, timeout=30.0, check_after=30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+        self.db_config = db_config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after  # ping connections idle for longer than this
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conn, returned_at)
+        self._size = 0  # idle + checked out
+        self._pid = None
+        self._orphans = []
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "connections_created": 0,
+            "connections_recycled": 0,
+        }
+
+    def _ensure_process(self):
+        # Called with the lock held. Connections inherited across fork() share
+        # their socket with the parent, so the child must neither use nor close
+        # them; keep references so they are not closed on GC either.
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        if self._pid is not None:
+            self._orphans.extend(conn for conn, _ in self._idle)
+            self._idle.clear()
+            self._size = 0
+            self._reset_stats()
+        self._pid = pid
+        while self._size < self.min_size:
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.db_config)
+        with self._cond:
+            self._stats["connections_created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats["connections_recycled"] += 1
+            self._cond.notify()
+        self._refill()
+
+    def _refill(self):
+        # Open connections until min_size again, each in a reserved slot and
+        # outside the lock, like getconn. If Postgres is unreachable, stop:
+        # the next checkout connects on demand.
+        while True:
+            with self._cond:
+                if self._pid != os.getpid() or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                return
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def _is_healthy(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        while True:
+            with self._cond:
+                self._ensure_process()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                    waited = True
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                else:
+                    # Reserve a slot, then connect outside the lock.
+                    conn, returned_at = None, None
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(conn, returned_at):
+                self._discard(conn)
+                continue
+
+            elapsed = time.monotonic() - start
+            with self._cond:
+                self._stats["checkouts"] += 1
+                self._stats["wait_time_total"] += elapsed
+                self._stats["wait_time_max"] = max(self._stats["wait_time_max"], elapsed)
+                if waited:
+                    self._stats["waits"] += 1
+            return conn
+
+    def putconn(self, conn):
+        with self._cond:
+            if self._pid != os.getpid():
+                # Checked out before a fork, so it belongs to the parent.
+                self._orphans.append(conn)
+                return
+        if not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                pass
+        if conn.closed or conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._size - len(self._idle)
+            stats["min_size"] = self.min_size
+            stats["max_size"] = self.max_size
+            return stats
+
+    def close(self):
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                conn.close()
+                self._size -= 1
+
+
+class Listener:
+    """A dedicated autocommit connection LISTENing on one or more channels."""
+
+    def __init__(self, db_config, channels):
+        self.conn = psycopg2.connect(**db_config)
+        self.conn.autocommit = True
+        with self.conn.cursor() as cur:
+            for channel in channels:
+                cur.execute(psycopg2.sql.SQL("LISTEN {};").format(psycopg2.sql.Identifier(channel)))
+
+    def wait(self, timeout):
+        """Block until a notification arrives or timeout seconds pass.
+
+        Returns the notifications received, or [] on timeout.
+        """
+        if not self.conn.notifies:
+            readable, _, _ = select.select([self.conn], [], [], timeout)
+            if readable:
+                self.conn.poll()
+        notifies = list(self.conn.notifies)
+        del self.conn.notifies[:]
+        return notifies
+
+    def close(self):
+        self.conn.close()
+
+
+COPY_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+def _copy_text(value):
+    """Format one value for COPY's text format (None is \\N)."""
+    if value is None:
+        return "\\N"
+    return str(value).translate(COPY_TEXT_ESCAPES)
+
+
 class Database:
-    def __init__(self, db_config):
+    def __init__(self, db_config, pool=None):
         self.db_config = db_config
+        self.pool = pool
+        self.id_index = None
+        self.delete_listeners = []
+
+    def attach_id_index(self, id_index):
+        # Lets get_adjacent_candidate_ids answer from memory and lets
+        # remove_duplicates invalidate the index (see index_utils.IdIndex).
+        self.id_index = id_index
+        self.delete_listeners.append(id_index.invalidate)
+
+    def _notify_deleted(self):
+        # In-process caches only see new ids on their own; tell them when
+        # this process deleted rows so they reload in full.
+        for listener in self.delete_listeners:
+            listener()
+
+    @classmethod
+    def pooled(cls, db_config, min_size=1, max_size=10, timeout=30.0, check_after=30.0):
+        pool = ConnectionPool(db_config, min_size=min_size, max_size=max_size,
+                              timeout=timeout, check_after=check_after)
+        return cls(db_config, pool=pool)
+
+    def pool_stats(self):
+        return self.pool.stats() if self.pool else None
+
+    @contextmanager
+    def listen(self, *channels):
+        # Never pooled: the session has to stay subscribed for its lifetime.
+        listener = Listener(self.db_config, channels)
+        try:
+            yield listener
+        finally:
+            listener.close()
 
     @contextmanager
     def db_connection(self):
+        if self.pool is not None:
+            with self.pool.connection() as conn:
+                yield conn
+            return
         conn = None
         try:
             conn = psycopg2.connect(**self.db_config)
@@ -16,13 +333,6 @@ class Database:
             if conn:
                 conn.close()
 
-    def fetch_new_candidates(self, last_sent_id):
-        with self.db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT id, data FROM cv_profiles WHERE id > %s ORDER BY id ASC;", (last_sent_id,))
-                rows = cur.fetchall()
-            return rows
-
     def fetch_candidate_by_id(self, candidate_id):
         with self.db_connection() as conn:
             with conn.cursor() as cur:
@@ -32,7 +342,33 @@ class Database:
                     return row[0]
                 return None
 
+    def fetch_ids_after(self, after_id):
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id FROM cv_profiles WHERE id > %s ORDER BY id ASC;", (after_id,))
+                return [row[0] for row in cur.fetchall()]
+
+    def fetch_skill_names_after(self, after_id):
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, skill_names FROM cv_profiles_summary WHERE id > %s ORDER BY id ASC;", (after_id,))
+                return cur.fetchall()
+
+    def fetch_candidates_by_ids(self, ids):
+        """Return [id, summary] rows for the given ids, in id order."""
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    SELECT {CANDIDATE_SUMMARY_COLUMNS} FROM cv_profiles_summary
+                    WHERE id = ANY(%s) ORDER BY id ASC;
+                """, (list(ids),))
+                rows = cur.fetchall()
+        return [self._summary_row(row) for row in rows]
+
     def get_adjacent_candidate_ids(self, current_id):
+        if self.id_index is not None:
+            return self._nav_links(*self.id_index.neighbours(current_id))
+
         with self.db_connection() as conn:
             with conn.cursor() as cur:
                 # Get previous candidate ID
@@ -53,59 +389,628 @@ class Database:
                 """, (current_id,))
                 next_id = cur.fetchone()
                 
-                return {
-                    'prev': f"/candidate/{prev_id[0]}" if prev_id else None,
-                    'next': f"/candidate/{next_id[0]}" if next_id else None
-                }
+                return self._nav_links(prev_id[0] if prev_id else None, next_id[0] if next_id else None)
+
+    @staticmethod
+    def _nav_links(prev_id, next_id):
+        return {
+            'prev': f"/candidate/{prev_id}" if prev_id is not None else None,
+            'next': f"/candidate/{next_id}" if next_id is not None else None
+        }
+
+    def fetch_candidate_with_nav(self, candidate_id):
+        """Return (data, nav) for a candidate page in a single query, or None
+        if the id does not exist (the neighbour lookups are then skipped)."""
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT c.data, prev.id, next.id
+                    FROM cv_profiles c
+                    LEFT JOIN LATERAL (
+                        SELECT id FROM cv_profiles WHERE id < c.id ORDER BY id DESC LIMIT 1
+                    ) AS prev ON true
+                    LEFT JOIN LATERAL (
+                        SELECT id FROM cv_profiles WHERE id > c.id ORDER BY id ASC LIMIT 1
+                    ) AS next ON true
+                    WHERE c.id = %s;
+                """, (candidate_id,))
+                row = cur.fetchone()
+        if row is None:
+            return None
+        data, prev_id, next_id = row
+        return data, self._nav_links(prev_id, next_id)
 
     def fetch_all_candidates(self, limit=10):
         with self.db_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
-                    SELECT DISTINCT ON (data->'candidate'->>'fullName') id, data 
-                    FROM cv_profiles 
-                    ORDER BY data->'candidate'->>'fullName', id
-                    LIMIT %s;
+                    SELECT p.id, p.data
+                    FROM (
+                        SELECT DISTINCT ON (full_name) id, full_name
+                        FROM cv_profiles_summary
+                        ORDER BY full_name, id
+                        LIMIT %s
+                    ) AS s
+                    JOIN cv_profiles p ON p.id = s.id
+                    ORDER BY s.full_name, s.id;
                 """, (limit,))
                 rows = cur.fetchall()
             return rows
 
-    def fetch_all_candidates_with_details(self):
+    @staticmethod
+    def _summary_row(row):
+        row_id, full_name, primary_profession, location, seniority, department, skill_names = row[:7]
+        return [row_id, {
+            'candidate': {
+                'fullName': full_name or 'N/A',
+                'primaryProfession': primary_profession or 'N/A',
+                'location': location or 'N/A',
+                'seniority': seniority or 'N/A',
+                'department': department or 'N/A',
+            },
+            'skills': [{'name': name} for name in skill_names or []],
+        }]
+
+    def fetch_all_candidates_json(self):
+        """Return every candidate's [id, summary] pair (see _summary_row) as a
+        JSON array, in bytes ready to be sent, without building any Python
+        objects per row."""
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                psycopg2.extensions.register_type(RAW_JSON, cur)
+                cur.execute(f"""
+                    SELECT COALESCE(json_agg({CANDIDATE_SUMMARY_JSON} ORDER BY id), '[]')::text
+                    FROM cv_profiles_summary;
+                """)
+                return cur.fetchone()[0]
+
+    def iter_candidates_json(self, fetch_size=2000):
+        """Yield the rows of fetch_all_candidates_json one at a time, as bytes,
+        through a server-side cursor."""
+        with self.db_connection() as conn:
+            with conn.cursor(name='iter_candidates_json') as cur:
+                psycopg2.extensions.register_type(RAW_JSON, cur)
+                cur.itersize = fetch_size
+                cur.execute(f"SELECT {CANDIDATE_SUMMARY_JSON}::text FROM cv_profiles_summary ORDER BY id ASC;")
+                for row in cur:
+                    yield row[0]
+
+    # Sort keys accepted by fetch_candidates_page, mapped to the SQL expression
+    # they order by. Every key is paired with id so the order is total and a
+    # keyset cursor never skips or repeats rows that share a name.
+    CANDIDATE_SORT_KEYS = {
+        'id': None,
+        'fullName': "COALESCE(full_name, '')",
+        'primaryProfession': "COALESCE(primary_profession, '')",
+    }
+
+    def fetch_candidates_page(self, limit, after=None, sort='id', descending=False, primary_profession=None):
+        """Return (rows, next_after) for one keyset page of the candidate list.
+
+        rows are [id, summary] pairs (see _summary_row).
+        after is the next_after value of the previous page, or None for the
+        first page; next_after is None once the last page has been returned.
+        primary_profession, if given, limits the list to that profession.
+        """
+        if sort not in self.CANDIDATE_SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+        expr = self.CANDIDATE_SORT_KEYS[sort]
+        op = '<' if descending else '>'
+        direction = 'DESC' if descending else 'ASC'
+
+        conditions, params = [], []
+        if primary_profession is not None:
+            conditions.append("primary_profession = %s")
+            params.append(primary_profession)
+        if expr is None:
+            select = f"SELECT {CANDIDATE_SUMMARY_COLUMNS}, NULL FROM cv_profiles_summary"
+            if after is not None:
+                conditions.append(f"id {op} %s")
+                params.append(after[1])
+            order = f"ORDER BY id {direction}"
+        else:
+            select = f"SELECT {CANDIDATE_SUMMARY_COLUMNS}, {expr} FROM cv_profiles_summary"
+            if after is not None:
+                conditions.append(f"({expr}, id) {op} (%s, %s)")
+                params.extend(after)
+            order = f"ORDER BY {expr} {direction}, id {direction}"
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
         with self.db_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("SELECT id, data FROM cv_profiles ORDER BY id ASC;")
+                # Fetch one extra row to learn whether another page exists.
+                cur.execute(f"{select} {where} {order} LIMIT %s;", params + [limit + 1])
                 rows = cur.fetchall()
-            
-            formatted_rows = []
-            for row_id, data in rows:
-                # Ensure data is a dictionary and has expected nested structures
-                if not isinstance(data, dict):
-                    data = {}
-                
-                candidate_data = data.get('candidate', {})
-                skills_data = data.get('skills', [])
-
-                # Provide default values for missing fields
-                formatted_data = {
-                    'candidate': {
-                        'fullName': candidate_data.get('fullName', 'N/A'),
-                        'primaryProfession': candidate_data.get('primaryProfession', 'N/A'),
-                        'location': candidate_data.get('location', 'N/A'),
-                        'seniority': candidate_data.get('seniority', 'N/A'),
-                        'department': candidate_data.get('department', 'N/A'),
-                    },
-                    'skills': skills_data, # Skills are handled in the frontend render function
-                    # Add other top-level keys if necessary
-                }
-                formatted_rows.append([row_id, formatted_data])
-            return formatted_rows
-
-    def fetch_all_jobs(self):
-        with self.db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT DISTINCT data->'candidate'->>'primaryProfession' FROM cv_profiles;")
+
+        next_after = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_after = (rows[-1][-1], rows[-1][0])
+        return [self._summary_row(row) for row in rows], next_after
+
+    def search_candidates(self, query, limit=50, threshold=0.3):
+        """Return up to limit [id, summary, score] rows whose name, profession
+        or skills contain a trigram match for query, best matches first.
+
+        Uses word similarity, so "jon" matches "Jonathan Smith" and
+        "kubernetes" matches a skill list containing it; threshold is the
+        minimum word_similarity (0-1) a field must reach.
+        """
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                # <% only uses the GIN trigram indexes with the threshold set
+                # as a setting rather than compared in the WHERE clause.
+                cur.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true);", (str(threshold),))
+                cur.execute(f"""
+                    SELECT {CANDIDATE_SUMMARY_COLUMNS}, GREATEST(
+                        word_similarity(%(q)s, COALESCE(full_name, '')),
+                        word_similarity(%(q)s, COALESCE(primary_profession, '')),
+                        word_similarity(%(q)s, cv_skill_names_text(skill_names))
+                    ) AS score
+                    FROM cv_profiles_summary
+                    WHERE %(q)s <%% full_name
+                       OR %(q)s <%% primary_profession
+                       OR %(q)s <%% cv_skill_names_text(skill_names)
+                    ORDER BY score DESC, id ASC
+                    LIMIT %(limit)s;
+                """, {'q': query, 'limit': limit})
+                rows = cur.fetchall()
+        return [self._summary_row(row) + [row[-1]] for row in rows]
+
+    # ts_headline does not escape the CV text, so mark matches with control
+    # characters and turn them into <mark> tags after escaping in Python.
+    _HEADLINE_START, _HEADLINE_STOP = '\x02', '\x03'
+
+    def full_text_search(self, query, limit=20):
+        """Return up to limit [id, summary, rank, snippet] rows matching a
+        web-search style query (quoted phrases, OR, -exclusions) against
+        skills and experience, best ranked first. snippet is HTML-escaped
+        text with the matching words wrapped in <mark>."""
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                # Headlines are costly, so only build them for the top rows.
+                cur.execute(f"""
+                    SELECT {', '.join('s.' + c for c in CANDIDATE_SUMMARY_COLUMNS.split(', '))},
+                        top.rank,
+                        ts_headline('english', cv_profiles_search_text(p.data), top.q,
+                                    %(options)s)
+                    FROM (
+                        SELECT id, q, ts_rank_cd(search_vector, q) AS rank
+                        FROM cv_profiles, websearch_to_tsquery('english', %(q)s) AS q
+                        WHERE search_vector @@ q
+                        ORDER BY rank DESC, id ASC
+                        LIMIT %(limit)s
+                    ) AS top
+                    JOIN cv_profiles p ON p.id = top.id
+                    JOIN cv_profiles_summary s ON s.id = top.id
+                    ORDER BY top.rank DESC, top.id ASC;
+                """, {
+                    'q': query,
+                    'limit': limit,
+                    'options': (f"StartSel={self._HEADLINE_START}, StopSel={self._HEADLINE_STOP}, "
+                                "MaxFragments=2, MaxWords=20, MinWords=8"),
+                })
+                rows = cur.fetchall()
+
+        results = []
+        for row in rows:
+            snippet = html.escape(row[-1] or '')
+            snippet = snippet.replace(self._HEADLINE_START, '<mark>').replace(self._HEADLINE_STOP, '</mark>')
+            results.append(self._summary_row(row) + [row[-2], snippet])
+        return results
+
+    def fetch_facet_counts(self, after_id=0):
+        """Count candidates with id > after_id per profession, seniority and
+        location in one pass. Returns (counts, total, max_id) where counts
+        maps each facet name to {value: count}."""
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT
+                        GROUPING(primary_profession, seniority, location),
+                        primary_profession, seniority, location,
+                        COUNT(*), MAX(id)
+                    FROM cv_profiles_summary
+                    WHERE id > %s
+                    GROUP BY GROUPING SETS ((primary_profession), (seniority), (location), ());
+                """, (after_id,))
                 rows = cur.fetchall()
-            return [row[0] for row in rows]
+
+        counts = {'primaryProfession': {}, 'seniority': {}, 'location': {}}
+        total, max_id = 0, after_id
+        for grouping, profession, seniority, location, count, group_max_id in rows:
+            # GROUPING() sets a bit for every column the row is not grouped by.
+            if grouping == 0b011:
+                counts['primaryProfession'][profession] = count
+            elif grouping == 0b101:
+                counts['seniority'][seniority] = count
+            elif grouping == 0b110:
+                counts['location'][location] = count
+            elif count:
+                total, max_id = count, group_max_id
+        return counts, total, max_id
+
+    def fetch_max_id(self):
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT COALESCE(MAX(id), 0) FROM cv_profiles;")
+                return cur.fetchone()[0]
+
+    def remove_duplicates_batch(self, low, high, dry_run=False, lock_timeout_ms=2000):
+        """Delete the duplicates with low < id <= high in one short transaction.
+
+        A row is a duplicate when another row with the same fullName has a
+        smaller id, which is what remove_duplicates keeps. Batches are
+        independent, so they can be run in any order and re-run safely.
+        Returns [(id, kept_id, full_name)] for the rows deleted, or the rows
+        that would be deleted when dry_run is set. Raises
+        psycopg2.errors.LockNotAvailable if a row lock is not granted within
+        lock_timeout_ms.
+        """
+        select_duplicates = """
+            SELECT s.id, k.id AS kept_id, s.full_name
+            FROM cv_profiles_summary s
+            CROSS JOIN LATERAL (
+                SELECT o.id FROM cv_profiles_summary o
+                WHERE (o.full_name = s.full_name OR (o.full_name IS NULL AND s.full_name IS NULL))
+                  AND o.id < s.id
+                ORDER BY o.id ASC
+                LIMIT 1
+            ) AS k
+            WHERE s.id > %s AND s.id <= %s
+        """
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT set_config('lock_timeout', %s, true);", (f"{int(lock_timeout_ms)}ms",))
+                if dry_run:
+                    cur.execute(select_duplicates + " ORDER BY s.id;", (low, high))
+                    rows = cur.fetchall()
+                    conn.rollback()
+                    return rows
+                cur.execute(f"""
+                    WITH duplicates AS ({select_duplicates})
+                    DELETE FROM cv_profiles p
+                    USING duplicates d
+                    WHERE p.id = d.id
+                    RETURNING d.*;
+                """, (low, high))
+                rows = sorted(cur.fetchall())
+                conn.commit()
+        if rows:
+            self._notify_deleted()
+        return rows
+
+    def iter_rows_missing_minhash(self, fetch_size=1000):
+        """Yield (id, data) for rows without a stored MinHash signature, i.e.
+        new rows and rows whose data changed since it was computed (see
+        tools/db/find_near_duplicates.py)."""
+        with self.db_connection() as conn:
+            with conn.cursor(name='iter_rows_missing_minhash') as cur:
+                cur.itersize = fetch_size
+                cur.execute("""
+                    SELECT p.id, p.data FROM cv_profiles p
+                    WHERE NOT EXISTS (SELECT 1 FROM cv_profiles_minhash m WHERE m.id = p.id)
+                    ORDER BY p.id ASC;
+                """)
+                yield from cur
+
+    def save_minhash_signatures(self, rows):
+        """Store (id, signature) pairs, replacing existing signatures."""
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                psycopg2.extras.execute_values(cur, """
+                    INSERT INTO cv_profiles_minhash (id, signature)
+                    SELECT v.id, v.signature FROM (VALUES %s) AS v (id, signature)
+                    JOIN cv_profiles p ON p.id = v.id
+                    ON CONFLICT (id) DO UPDATE SET signature = EXCLUDED.signature;
+                """, rows, template="(%s, %s::bigint[])")
+            conn.commit()
+
+    def iter_minhash_signatures(self, fetch_size=5000):
+        """Yield (id, signature) for rows with a non-empty signature. Rows
+        without features are stored with an empty one, so they are not
+        recomputed, but never take part in matching."""
+        with self.db_connection() as conn:
+            with conn.cursor(name='iter_minhash_signatures') as cur:
+                cur.itersize = fetch_size
+                cur.execute("SELECT id, signature FROM cv_profiles_minhash WHERE signature <> '{}' ORDER BY id ASC;")
+                yield from cur
+
+    def delete_candidates(self, ids):
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM cv_profiles WHERE id = ANY(%s) RETURNING id;", (list(ids),))
+                deleted = [row[0] for row in cur.fetchall()]
+            conn.commit()
+        if deleted:
+            self._notify_deleted()
+        return deleted
+
+    def route_candidates(self, route, limit):
+        """Route up to limit candidates from cv_deliveries_to_route.
+
+        route is called with each (id, *ROUTING_ROW_COLUMNS) row and returns
+        the chat ids to deliver it to. The queue rows are deleted in the
+        transaction that adds the pending deliveries, so every candidate is
+        routed once. Returns the number of candidates taken off the queue,
+        0 once it is empty.
+        """
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    DELETE FROM cv_deliveries_to_route
+                    WHERE candidate_id IN (
+                        SELECT candidate_id FROM cv_deliveries_to_route
+                        ORDER BY candidate_id
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING candidate_id;
+                """, (limit,))
+                ids = [row[0] for row in cur.fetchall()]
+                if ids:
+                    cur.execute(f"""
+                        SELECT id, {ROUTING_ROW_COLUMNS} FROM cv_profiles_summary
+                        WHERE id = ANY(%s) ORDER BY id;
+                    """, (ids,))
+                    deliveries = [(chat_id, row[0]) for row in cur.fetchall() for chat_id in route(row)]
+                    if deliveries:
+                        psycopg2.extras.execute_values(cur, """
+                            INSERT INTO cv_deliveries (chat_id, candidate_id) VALUES %s
+                            ON CONFLICT DO NOTHING;
+                        """, deliveries)
+            conn.commit()
+        return len(ids)
+
+    def skip_routing(self, up_to_id):
+        """Take the queued candidates up to up_to_id off
+        cv_deliveries_to_route without delivering them."""
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM cv_deliveries_to_route WHERE candidate_id <= %s;", (up_to_id,))
+            conn.commit()
+
+    def iter_routing_rows(self, up_to_id, fetch_size=2000):
+        """Yield (id, *ROUTING_ROW_COLUMNS) for the queued candidates up to
+        up_to_id, in id order."""
+        with self.db_connection() as conn:
+            with conn.cursor(name='iter_routing_rows') as cur:
+                cur.itersize = fetch_size
+                cur.execute(f"""
+                    SELECT s.id, {ROUTING_ROW_COLUMNS}
+                    FROM cv_deliveries_to_route q
+                    JOIN cv_profiles_summary s ON s.id = q.candidate_id
+                    WHERE q.candidate_id <= %s
+                    ORDER BY q.candidate_id;
+                """, (up_to_id,))
+                yield from cur
+
+    def fetch_backlog(self, keep):
+        """Size up the candidates waiting in cv_deliveries_to_route.
+
+        Returns (total, first_id, cutoff_id): how many there are, the lowest
+        id, and the id below which all but the newest keep fall (None when
+        there are no more than keep).
+        """
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT
+                        (SELECT COUNT(*) FROM cv_deliveries_to_route),
+                        (SELECT MIN(candidate_id) FROM cv_deliveries_to_route),
+                        (SELECT candidate_id FROM cv_deliveries_to_route
+                         ORDER BY candidate_id DESC OFFSET %s LIMIT 1);
+                """, (keep,))
+                return cur.fetchone()
+
+    def fetch_delivery_stats(self):
+        """Return (chat_id, status, count, last_sent_at) for cv_deliveries."""
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT chat_id, status, COUNT(*), MAX(sent_at)
+                    FROM cv_deliveries
+                    GROUP BY chat_id, status
+                    ORDER BY chat_id, status;
+                """)
+                return cur.fetchall()
+
+    def claim_deliveries(self, chat_id, limit, lease_seconds):
+        """Mark up to limit due deliveries for chat_id as 'sending' and return
+        them as (candidate_id, attempts, data), lowest id first.
+
+        Rows claimed by another sender are skipped rather than waited for.
+        A claim older than lease_seconds counts as abandoned (its sender
+        crashed before recording the result) and is claimed again.
+        """
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE cv_deliveries d
+                    SET status = 'sending', attempts = d.attempts + 1, claimed_at = NOW()
+                    FROM (
+                        SELECT chat_id, candidate_id
+                        FROM cv_deliveries
+                        WHERE chat_id = %s
+                          AND status IN ('pending', 'sending')
+                          AND (status = 'pending' OR claimed_at < NOW() - make_interval(secs => %s))
+                          AND next_attempt_at <= NOW()
+                        ORDER BY candidate_id
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    ) AS c
+                    WHERE d.chat_id = c.chat_id AND d.candidate_id = c.candidate_id
+                    RETURNING d.candidate_id, d.attempts,
+                        (SELECT data FROM cv_profiles p WHERE p.id = d.candidate_id);
+                """, (chat_id, lease_seconds, limit))
+                rows = sorted(cur.fetchall(), key=lambda row: row[0])
+            conn.commit()
+        return rows
+
+    def renew_claims(self, chat_id, claims):
+        """Restart the lease of deliveries still being sent.
+
+        claims are (candidate_id, attempts) pairs as returned by
+        claim_deliveries; every claim bumps attempts, so a row whose lease
+        ran out and was claimed again elsewhere no longer matches. Returns
+        the set of candidate ids that are still ours.
+        """
+        if not claims:
+            return set()
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                rows = psycopg2.extras.execute_values(cur, """
+                    UPDATE cv_deliveries d SET claimed_at = NOW()
+                    FROM (VALUES %s) AS v (chat_id, candidate_id, attempts)
+                    WHERE d.chat_id = v.chat_id AND d.candidate_id = v.candidate_id
+                      AND d.attempts = v.attempts AND d.status = 'sending'
+                    RETURNING d.candidate_id;
+                """, [(chat_id, candidate_id, attempts) for candidate_id, attempts in claims], fetch=True)
+            conn.commit()
+        return {row[0] for row in rows}
+
+    def record_deliveries(self, results):
+        """Store the outcome of claimed deliveries in one transaction.
+
+        results are (chat_id, candidate_id, status, message_id, error,
+        retry_delay) tuples; retry_delay is the number of seconds before a
+        'pending' row may be claimed again.
+        """
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                psycopg2.extras.execute_values(cur, """
+                    UPDATE cv_deliveries d SET
+                        status = v.status,
+                        message_id = COALESCE(v.message_id, d.message_id),
+                        last_error = v.error,
+                        sent_at = CASE WHEN v.status = 'sent' THEN NOW() ELSE d.sent_at END,
+                        next_attempt_at = NOW() + make_interval(secs => v.retry_delay),
+                        claimed_at = NULL
+                    FROM (VALUES %s) AS v (chat_id, candidate_id, status, message_id, error, retry_delay)
+                    WHERE d.chat_id = v.chat_id AND d.candidate_id = v.candidate_id;
+                """, results, template="(%s, %s, %s, %s::bigint, %s, %s::float8)")
+            conn.commit()
+
+    def fetch_data_version(self):
+        """Return (version, changed_at) of the cv_profiles change counter
+        maintained by tools/db/create_change_tracking.py, or None if that
+        has not been set up on this database."""
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                try:
+                    cur.execute("SELECT version, changed_at FROM cv_profiles_version WHERE singleton;")
+                except psycopg2.errors.UndefinedTable:
+                    return None
+                return cur.fetchone()
+
+    def fetch_now(self):
+        """Return the database clock, used to stamp snapshots."""
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT NOW();")
+                return cur.fetchone()[0]
+
+    def iter_profiles_for_export(self, after_id=0, since=None, fetch_size=2000):
+        """Yield (id, json_line) for cv_profiles rows after after_id in id
+        order, optionally only those updated after since. The line is built
+        by Postgres, so data is never decoded here."""
+        with self.db_connection() as conn:
+            with conn.cursor(name='iter_profiles_for_export') as cur:
+                cur.itersize = fetch_size
+                cur.execute("""
+                    SELECT id, json_build_object(
+                        'id', id, 'created_at', created_at, 'updated_at', updated_at,
+                        'source', source, 'source_file_name', source_file_name, 'data', data
+                    )::text
+                    FROM cv_profiles
+                    WHERE id > %s AND (%s::timestamptz IS NULL OR updated_at > %s)
+                    ORDER BY id ASC;
+                """, (after_id, since, since))
+                yield from cur
+
+    def iter_deleted_for_export(self, since):
+        """Yield (id, json_line) tombstones for rows deleted after since that
+        have not been inserted again."""
+        with self.db_connection() as conn:
+            with conn.cursor(name='iter_deleted_for_export') as cur:
+                cur.execute("""
+                    SELECT d.id, json_build_object('id', d.id, 'deleted_at', d.deleted_at)::text
+                    FROM cv_profiles_deleted d
+                    WHERE d.deleted_at > %s
+                      AND NOT EXISTS (SELECT 1 FROM cv_profiles p WHERE p.id = d.id)
+                    ORDER BY d.id ASC;
+                """, (since,))
+                yield from cur
+
+    def copy_upsert_profiles(self, rows, skip_existing_files=False):
+        """Load (id, source, source_file_name, data_json) rows in one
+        transaction: COPY into a temp staging table, then one set-based
+        upsert. Rows with an id replace that row; rows without one are
+        inserted, or skipped when skip_existing_files is set and a row with
+        the same source_file_name already exists or comes earlier in rows.
+        Returns (inserted, updated).
+        """
+        buf = io.StringIO()
+        for seq, row in enumerate(rows):
+            buf.write("\t".join([str(seq)] + [_copy_text(value) for value in row]))
+            buf.write("\n")
+        buf.seek(0)
+
+        skip_existing = """
+            AND (s.file_seq = 1 OR s.source_file_name IS NULL)
+            AND NOT EXISTS (
+                SELECT 1 FROM cv_profiles p WHERE p.source_file_name = s.source_file_name
+            )""" if skip_existing_files else ""
+
+        with self.db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    CREATE TEMP TABLE cv_profiles_staging (
+                        seq INTEGER, id INTEGER, source TEXT, source_file_name TEXT, data JSONB
+                    ) ON COMMIT DROP;
+                """)
+                cur.copy_expert("COPY cv_profiles_staging FROM STDIN;", buf)
+
+                # The same id twice in one batch: the later record wins.
+                cur.execute("""
+                    INSERT INTO cv_profiles (id, source, source_file_name, data)
+                    SELECT DISTINCT ON (id) id, COALESCE(source, 'unknown'), source_file_name, data
+                    FROM cv_profiles_staging
+                    WHERE id IS NOT NULL
+                    ORDER BY id, seq DESC
+                    ON CONFLICT (id) DO UPDATE SET
+                        source = EXCLUDED.source,
+                        source_file_name = EXCLUDED.source_file_name,
+                        data = EXCLUDED.data,
+                        updated_at = NOW()
+                    RETURNING (xmax = 0);
+                """)
+                results = [row[0] for row in cur.fetchall()]
+                inserted = sum(results)
+                updated = len(results) - inserted
+                if results:
+                    # Explicit ids bypass the sequence; move it past them before
+                    # the id-less rows draw from it.
+                    cur.execute("""
+                        SELECT setval(pg_get_serial_sequence('cv_profiles', 'id'),
+                                      GREATEST((SELECT MAX(id) FROM cv_profiles), 1));
+                    """)
+
+                cur.execute(f"""
+                    INSERT INTO cv_profiles (source, source_file_name, data)
+                    SELECT COALESCE(source, 'unknown'), source_file_name, data
+                    FROM (
+                        SELECT *, row_number() OVER (PARTITION BY source_file_name ORDER BY seq) AS file_seq
+                        FROM cv_profiles_staging
+                        WHERE id IS NULL
+                    ) s
+                    WHERE true{skip_existing}
+                    ORDER BY seq;
+                """)
+                inserted += cur.rowcount
+
+            conn.commit()
+        return inserted, updated
 
     def remove_duplicates(self):
         with self.db_connection() as conn:
@@ -117,13 +1022,14 @@ class Database:
                         FROM (
                             SELECT
                                 id,
-                                (data->'candidate'->>'fullName') AS full_name,
-                                ROW_NUMBER() OVER(PARTITION BY (data->'candidate'->>'fullName') ORDER BY id) as rn
-                            FROM cv_profiles
+                                full_name,
+                                ROW_NUMBER() OVER(PARTITION BY full_name ORDER BY id) as rn
+                            FROM cv_profiles_summary
                         ) AS subquery
                         WHERE rn > 1
                     );
                 """
                 cur.execute(delete_query)
                 conn.commit()
+                self._notify_deleted()
                 print(f"Removed {cur.rowcount} duplicate entries.")
\ No newline at end of file
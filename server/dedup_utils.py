@@ -0,0 +1,140 @@
+import hashlib
+import random
+import re
+from collections import defaultdict
+
+# MinHash parameters. NUM_BANDS * ROWS_PER_BAND must equal NUM_PERM. Two CVs
+# with Jaccard similarity s share at least one band with probability
+# 1 - (1 - s**ROWS_PER_BAND) ** NUM_BANDS: ~0.99 at s=0.6, ~0.08 at s=0.2.
+NUM_PERM = 128
+NUM_BANDS = 32
+ROWS_PER_BAND = NUM_PERM // NUM_BANDS
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(7)  # fixed seed: stored signatures must stay comparable
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _words(text):
+    return _WORD_RE.findall(str(text or "").lower())
+
+
+def cv_features(data):
+    """Return the set of features compared between two CVs.
+
+    The name only contributes its last word and first initial, so "Jon
+    Smith" and "Jonathan Smith" match on it while it stays a small share of
+    the set. Skills, companies and titles contribute whole normalized
+    values and decide the score, so two different people who share a name
+    still come out different.
+    """
+    if not isinstance(data, dict):
+        data = {}
+    features = set()
+
+    candidate = data.get("candidate") or {}
+    name = _words(candidate.get("fullName") if isinstance(candidate, dict) else "")
+    if name:
+        features.add("n:" + name[-1])
+        features.add(f"i:{name[0][0]} {name[-1]}")
+
+    for skill in data.get("skills") or []:
+        if isinstance(skill, dict) and skill.get("name"):
+            features.add("s:" + " ".join(_words(skill["name"])))
+
+    for exp in data.get("experience") or []:
+        if not isinstance(exp, dict):
+            continue
+        if exp.get("companyName"):
+            features.add("c:" + " ".join(_words(exp["companyName"])))
+        if exp.get("title"):
+            features.add("t:" + " ".join(_words(exp["title"])))
+
+    return features
+
+
+def _feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+
+
+def minhash_signature(features):
+    """Return the NUM_PERM-value MinHash signature of a feature set.
+
+    A CV with no features (no name, skills or experience) gets an empty
+    signature: it is like every other empty CV, not a duplicate of it, and
+    is left out of candidate_pairs.
+    """
+    if not features:
+        return []
+    hashes = [_feature_hash(f) for f in features]
+    return [
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def estimated_similarity(sig_a, sig_b):
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+
+def candidate_pairs(signatures):
+    """Yield each (id_a, id_b) pair, id_a < id_b, that shares an LSH band.
+
+    signatures is an iterable of (id, signature). Work is linear in the
+    number of rows plus the number of colliding pairs. Empty signatures
+    are skipped.
+    """
+    buckets = defaultdict(list)
+    for row_id, signature in signatures:
+        if not signature:
+            continue
+        for band in range(NUM_BANDS):
+            key = (band, tuple(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]))
+            buckets[key].append(row_id)
+
+    seen = set()
+    for ids in buckets.values():
+        if len(ids) < 2:
+            continue
+        ids.sort()
+        for i, id_a in enumerate(ids):
+            for id_b in ids[i + 1:]:
+                if (id_a, id_b) not in seen:
+                    seen.add((id_a, id_b))
+                    yield id_a, id_b
+
+
+def near_duplicate_clusters(signatures, threshold=0.6):
+    """Group rows whose estimated similarity is at least threshold.
+
+    Returns a list of (keep_id, {member_id: similarity}) in keep_id order.
+    Rows are visited oldest first and each unclaimed row claims every
+    unclaimed row similar to it, so every member is directly similar to its
+    keep_id rather than only linked through a chain of other rows.
+    """
+    signatures = dict(signatures)
+    neighbours = defaultdict(dict)
+    for id_a, id_b in candidate_pairs(signatures.items()):
+        similarity = estimated_similarity(signatures[id_a], signatures[id_b])
+        if similarity >= threshold:
+            neighbours[id_a][id_b] = similarity
+            neighbours[id_b][id_a] = similarity
+
+    claimed = set()
+    clusters = []
+    for keep_id in sorted(neighbours):
+        if keep_id in claimed:
+            continue
+        # Any unclaimed neighbour has a larger id: a smaller one would have
+        # been visited first and claimed keep_id itself.
+        members = {i: sim for i, sim in sorted(neighbours[keep_id].items()) if i not in claimed}
+        if members:
+            claimed.add(keep_id)
+            claimed.update(members)
+            clusters.append((keep_id, members))
+    return clusters
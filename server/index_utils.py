@@ -0,0 +1,504 @@
+import gzip
+import json
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from db_utils import CHANGED_CANDIDATE_CHANNEL
+
+# Snapshots are compressed off the request path, once per data version; 11
+# is about 10% smaller again but dozens of times slower on large lists.
+BROTLI_QUALITY = 9
+
+
+class ProcessThread:
+    """A daemon thread running target, started at most once per process.
+
+    Threads do not survive fork, so in a child that inherited the owner
+    (e.g. a gunicorn worker under --preload) the next start() launches a
+    new one.
+    """
+
+    def __init__(self, target, name):
+        self.target = target
+        self.name = name
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self.target, name=self.name, daemon=True).start()
+
+
+class RefreshingIndex:
+    """Base for in-memory copies of a table kept current by refreshes.
+
+    Subclasses implement _load(), which rebuilds everything, and _update(),
+    which adds the rows inserted since; both run with the lock held. Reads
+    call _maybe_refresh() first: it updates at most every refresh_interval
+    seconds and reloads once the copy is older than max_age, or when it was
+    invalidated (deletes and updates are not visible to _update) and is at
+    least refresh_interval old.
+    """
+
+    def __init__(self, db, refresh_interval, max_age):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._refreshed_at = None
+        self._stale = True
+
+    def invalidate(self):
+        self._stale = True
+
+    def refresh(self, full=False):
+        with self._lock:
+            now = time.monotonic()
+            if full or self._stale:
+                self._load()
+                self._stale = False
+                self._loaded_at = now
+            else:
+                self._update()
+            self._refreshed_at = now
+
+    def _maybe_refresh(self):
+        now = time.monotonic()
+        if self._loaded_at is None:
+            self.refresh(full=True)
+            return
+        age = now - self._loaded_at
+        # Invalidations can come with every write, so full reloads are
+        # spaced like incremental refreshes.
+        if age > self.max_age or (self._stale and age > self.refresh_interval):
+            self.refresh(full=True)
+        elif now - self._refreshed_at > self.refresh_interval:
+            self.refresh()
+
+
+class ChangeListener:
+    """Passes the changes Postgres reports on CHANGED_CANDIDATE_CHANNEL on to
+    subscribers in this process.
+
+    Each subscriber is called with the id of the updated or deleted
+    candidate, or with None when anything may have changed: on TRUNCATE, and
+    whenever the listener (re)connects or disconnects, since notifications
+    sent meanwhile are lost. The LISTEN connection lives in a background
+    thread that start() launches once per process.
+    """
+
+    def __init__(self, db, reconnect_delay=5.0):
+        self.db = db
+        self.reconnect_delay = reconnect_delay
+        self._subscribers = []
+        self._thread = ProcessThread(self._run, "candidate-change-listener")
+        # The pid whose thread is connected, so a forked child does not take
+        # over its parent's state.
+        self._connected_pid = None
+
+    @property
+    def connected(self):
+        return self._connected_pid == os.getpid()
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def _publish(self, candidate_id):
+        for callback in self._subscribers:
+            callback(candidate_id)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                with self.db.listen(CHANGED_CANDIDATE_CHANNEL) as listener:
+                    self._connected_pid = os.getpid()
+                    self._publish(None)
+                    while True:
+                        for notify in listener.wait(self.reconnect_delay):
+                            if notify.payload == '*':
+                                self._publish(None)
+                            else:
+                                for candidate_id in notify.payload.split(','):
+                                    self._publish(int(candidate_id))
+            except Exception as e:
+                print(f"Candidate change listener disconnected: {e}")
+            self._connected_pid = None
+            self._publish(None)
+            time.sleep(self.reconnect_delay)
+
+
+class IdIndex(RefreshingIndex):
+    """Sorted array of every cv_profiles id held in the web process.
+
+    Answers existence checks and prev/next lookups with a binary search
+    instead of a query. New ids are appended by fetching everything above
+    the current maximum; deletes are not visible that way, so the index is
+    reloaded in full once it is older than max_age, or when invalidated (on
+    a ChangeListener notification, say) and at least refresh_interval old.
+    """
+
+    def __init__(self, db, refresh_interval=5.0, max_age=300.0):
+        super().__init__(db, refresh_interval, max_age)
+        self._ids = array('q')
+
+    def __len__(self):
+        return len(self._ids)
+
+    def discard(self, candidate_id):
+        with self._lock:
+            i = bisect_left(self._ids, candidate_id)
+            if i < len(self._ids) and self._ids[i] == candidate_id:
+                del self._ids[i]
+
+    def _load(self):
+        self._ids = array('q', self.db.fetch_ids_after(0))
+
+    def _update(self):
+        after = self._ids[-1] if self._ids else 0
+        self._ids.extend(self.db.fetch_ids_after(after))
+
+    def _contains(self, candidate_id):
+        ids = self._ids
+        i = bisect_left(ids, candidate_id)
+        return i < len(ids) and ids[i] == candidate_id
+
+    def contains(self, candidate_id):
+        self._maybe_refresh()
+        if self._contains(candidate_id):
+            return True
+        if not self._ids or candidate_id > self._ids[-1]:
+            # Possibly inserted since the last refresh (e.g. a link the bot
+            # just sent), so look before reporting it missing.
+            self.refresh()
+            return self._contains(candidate_id)
+        return False
+
+    def neighbours(self, candidate_id):
+        """Return (prev_id, next_id) around candidate_id, None at either end."""
+        self._maybe_refresh()
+        ids = self._ids
+        i = bisect_left(ids, candidate_id)
+        j = bisect_right(ids, candidate_id)
+        return (ids[i - 1] if i > 0 else None, ids[j] if j < len(ids) else None)
+
+
+class FacetCache(RefreshingIndex):
+    """Candidate counts per profession, seniority and location.
+
+    Rows added since the last refresh are counted and merged in at most
+    every refresh_interval seconds. Updates and deletes are not visible that
+    way, so the counts are rebuilt after ttl seconds, or when invalidated
+    and at least refresh_interval old.
+    """
+
+    def __init__(self, db, refresh_interval=5.0, ttl=300.0):
+        super().__init__(db, refresh_interval, max_age=ttl)
+        self._counts = None
+        self._total = 0
+        self._max_id = 0
+        # Wall-clock time the counts last changed, for Last-Modified headers.
+        self.modified_at = None
+
+    def _load(self):
+        counts, self._total, self._max_id = self.db.fetch_facet_counts()
+        if counts != self._counts:
+            self._counts = counts
+            self.modified_at = time.time()
+
+    def _update(self):
+        new_counts, new_total, new_max_id = self.db.fetch_facet_counts(self._max_id)
+        if new_total:
+            # Merge into copies so readers never see a half-updated dict.
+            merged = {facet: dict(values) for facet, values in self._counts.items()}
+            for facet, values in new_counts.items():
+                for value, count in values.items():
+                    merged[facet][value] = merged[facet].get(value, 0) + count
+            self._counts = merged
+            self._total += new_total
+            self._max_id = new_max_id
+            self.modified_at = time.time()
+
+    def facets(self):
+        """Return {'total': n, facet: [{'value': v, 'count': c}, ...]} with
+        each facet's values ordered by descending count."""
+        self._maybe_refresh()
+        counts = self._counts
+        result = {'total': self._total}
+        for facet, values in counts.items():
+            result[facet] = [
+                {'value': value, 'count': count}
+                for value, count in sorted(values.items(), key=lambda item: (-item[1], str(item[0])))
+            ]
+        return result
+
+    def values(self, facet):
+        self._maybe_refresh()
+        return list(self._counts[facet])
+
+
+def normalize_skill(name):
+    return " ".join(name.lower().split())
+
+
+def bitmap_from_ids(ids):
+    """Build an int with bit i set for every i in ids (ascending)."""
+    if not ids:
+        return 0
+    buf = bytearray(ids[-1] // 8 + 1)
+    for i in ids:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, 'little')
+
+
+def bitmap_ids(bitmap, start=0, limit=None):
+    """Return the set bits of bitmap that are >= start, ascending, at most limit."""
+    # bin() runs in C; reversed it puts bit 0 first and str.find skips zeros.
+    bits = bin(bitmap >> start)[:1:-1]
+    ids = []
+    pos = bits.find('1')
+    while pos != -1 and (limit is None or len(ids) < limit):
+        ids.append(start + pos)
+        pos = bits.find('1', pos + 1)
+    return ids
+
+
+class SkillIndex(RefreshingIndex):
+    """Inverted index from normalized skill name to candidate ids.
+
+    Each skill keeps a compact ascending array('q') of ids; the skills used
+    in a query are turned into int bitmaps (kept in a small LRU) so AND, OR
+    and NOT are single bitwise operations however many candidates match.
+    New ids are added from cv_profiles_summary every refresh_interval
+    seconds; updates and deletes are picked up by a full rebuild after
+    max_age seconds, or when invalidated and at least refresh_interval old.
+    """
+
+    def __init__(self, db, refresh_interval=5.0, max_age=300.0, bitmap_cache_size=256):
+        super().__init__(db, refresh_interval, max_age)
+        self.bitmap_cache_size = bitmap_cache_size
+        self._postings = {}
+        self._ids = array('q')
+        self._bitmaps = OrderedDict()
+        self._all = None
+
+    def _add_rows(self, rows):
+        added = {}
+        for row_id, skill_names in rows:
+            self._ids.append(row_id)
+            for skill in {normalize_skill(name) for name in skill_names or []}:
+                added.setdefault(skill, []).append(row_id)
+        for skill, ids in added.items():
+            self._postings.setdefault(skill, array('q')).extend(ids)
+            if skill in self._bitmaps:
+                self._bitmaps[skill] |= bitmap_from_ids(ids)
+        if rows and self._all is not None:
+            self._all |= bitmap_from_ids([row_id for row_id, _ in rows])
+
+    def _load(self):
+        self._postings = {}
+        self._ids = array('q')
+        self._bitmaps.clear()
+        self._all = None
+        self._add_rows(self.db.fetch_skill_names_after(0))
+
+    def _update(self):
+        after = self._ids[-1] if self._ids else 0
+        self._add_rows(self.db.fetch_skill_names_after(after))
+
+    def _bitmap(self, skill):
+        # Called with the lock held.
+        skill = normalize_skill(skill)
+        if skill in self._bitmaps:
+            self._bitmaps.move_to_end(skill)
+            return self._bitmaps[skill]
+        bitmap = bitmap_from_ids(self._postings.get(skill, ()))
+        self._bitmaps[skill] = bitmap
+        if len(self._bitmaps) > self.bitmap_cache_size:
+            self._bitmaps.popitem(last=False)
+        return bitmap
+
+    def query(self, all_of=(), any_of=(), none_of=()):
+        """Return a bitmap of the ids having every skill in all_of, at least
+        one in any_of (when given) and none in none_of."""
+        self._maybe_refresh()
+        with self._lock:
+            if self._all is None:
+                self._all = bitmap_from_ids(self._ids)
+            result = self._all
+            for skill in all_of:
+                result &= self._bitmap(skill)
+            if any_of:
+                matches = 0
+                for skill in any_of:
+                    matches |= self._bitmap(skill)
+                result &= matches
+            for skill in none_of:
+                result &= ~self._bitmap(skill)
+            return result
+
+
+class CandidateCache:
+    """LRU of fetch_candidate_by_id results, bounded by entry age and size.
+
+    Entries are dropped as soon as the ChangeListener reports a change (see
+    tools/db/create_notify_triggers.py). While it is not connected nothing
+    is cached, since changes could be missed. Sizes are the length of the data as JSON, an approximation of
+    the memory the decoded dict takes.
+    """
+
+    def __init__(self, db, changes, max_bytes=64 * 1024 * 1024, ttl=300.0):
+        self.db = db
+        self.changes = changes
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Bumped on every invalidation, so a fetch that raced with one is
+        # not stored afterwards.
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        changes.subscribe(self._changed)
+
+    def _changed(self, candidate_id):
+        if candidate_id is None:
+            self.clear()
+        else:
+            self.invalidate(candidate_id)
+
+    def _remove(self, candidate_id):
+        # Called with the lock held.
+        _, size, _ = self._entries.pop(candidate_id)
+        self._bytes -= size
+
+    def invalidate(self, candidate_id):
+        with self._lock:
+            self._version += 1
+            if candidate_id in self._entries:
+                self._remove(candidate_id)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def get(self, candidate_id):
+        """Return the candidate's data like db.fetch_candidate_by_id."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(candidate_id)
+            if entry is not None:
+                data, _, expires = entry
+                if now < expires:
+                    self._entries.move_to_end(candidate_id)
+                    self.hits += 1
+                    return data
+                self._remove(candidate_id)
+                self.expirations += 1
+            self.misses += 1
+            version = self._version
+
+        data = self.db.fetch_candidate_by_id(candidate_id)
+        if data is None or not self.changes.connected:
+            return data
+        size = len(json.dumps(data, separators=(",", ":")))
+        if size > self.max_bytes:
+            return data
+        with self._lock:
+            if version != self._version:
+                return data
+            if candidate_id in self._entries:
+                self._remove(candidate_id)
+            self._entries[candidate_id] = (data, size, now + self.ttl)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return data
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'listening': self.changes.connected,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+class PayloadSnapshot:
+    """One response body, serialized and compressed once per data version.
+
+    A background thread polls db.fetch_data_version() every check_interval
+    seconds and, when the version moved, calls build() for the new body and
+    precomputes its gzip (and, with the brotli package, br) encodings. The
+    request path only picks one of the stored byte strings. Until the first
+    build finishes current() returns None.
+    """
+
+    def __init__(self, db, build, check_interval=1.0):
+        self.db = db
+        self.build = build
+        self.check_interval = check_interval
+        # (version, changed_at, {encoding: bytes}), replaced as a whole.
+        self._snapshot = None
+        self._builder = ProcessThread(self._run, "payload-snapshot-builder")
+        self.builds = 0
+        self.build_seconds = 0.0
+
+    def _run(self):
+        while True:
+            try:
+                data_version = self.db.fetch_data_version()
+                if data_version is None:
+                    raise RuntimeError("cv_profiles_version is missing; run tools/db/create_change_tracking.py")
+                version, changed_at = data_version
+                if self._snapshot is None or self._snapshot[0] != version:
+                    self._snapshot = self._build(version, changed_at)
+            except Exception as e:
+                print(f"Payload snapshot rebuild failed: {e}")
+            time.sleep(self.check_interval)
+
+    def _build(self, version, changed_at):
+        started = time.monotonic()
+        body = self.build()
+        variants = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+        self.builds += 1
+        self.build_seconds = time.monotonic() - started
+        return (version, changed_at, variants)
+
+    def current(self):
+        """Return (version, changed_at, {encoding: bytes}) or None."""
+        self._builder.start()
+        return self._snapshot
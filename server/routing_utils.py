@@ -0,0 +1,98 @@
+import json
+
+from index_utils import normalize_skill
+
+# Rule keys that match against a candidate, and the summary column each one
+# reads (see ROUTING_ROW_COLUMNS in db_utils).
+ROUTING_FIELDS = ('primaryProfession', 'seniority', 'location', 'skills')
+
+
+def load_routing_rules(path, default_chat_id):
+    """Read the rules from a JSON file, or route everything to default_chat_id
+    when no file is configured."""
+    if not path:
+        return [{'chat_id': default_chat_id}]
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class RoutingMatcher:
+    """Decides which chats receive a candidate.
+
+    A rule names a chat_id and any of ROUTING_FIELDS, each a value or a list
+    of values. A candidate matches a rule when, for every field the rule
+    names, it has at least one of the listed values (case-insensitive); a
+    rule that names no field matches everyone. A candidate goes to the chats
+    of all the rules it matches.
+
+    The rules are compiled once into a bitmask per field value, with bit i
+    standing for rule i, so matching is one dict lookup per candidate value
+    and a few integer ANDs however many rules there are.
+    """
+
+    def __init__(self, rules):
+        self.chat_ids = []
+        self.chat_options = {}
+        self._all = (1 << len(rules)) - 1
+        self._wildcard = {field: 0 for field in ROUTING_FIELDS}
+        self._masks = {field: {} for field in ROUTING_FIELDS}
+
+        for i, rule in enumerate(rules):
+            unknown = set(rule) - set(ROUTING_FIELDS) - {'chat_id', 'rate_per_minute'}
+            if 'chat_id' not in rule or unknown:
+                raise ValueError(f"Invalid routing rule {i}: {rule}")
+            chat_id = str(rule['chat_id'])
+            self.chat_ids.append(chat_id)
+            if 'rate_per_minute' in rule:
+                self.chat_options.setdefault(chat_id, {})['rate_per_minute'] = float(rule['rate_per_minute'])
+            for field in ROUTING_FIELDS:
+                values = rule.get(field)
+                if values is None:
+                    self._wildcard[field] |= 1 << i
+                    continue
+                if isinstance(values, str):
+                    values = [values]
+                # An empty list would match nobody and a non-string would
+                # never equal a normalized candidate value; both are typos.
+                if (not isinstance(values, list) or not values
+                        or not all(isinstance(value, str) and value.strip() for value in values)):
+                    raise ValueError(f"Invalid routing rule {i}: {field} must be a value or a non-empty list of values")
+                masks = self._masks[field]
+                for value in values:
+                    key = normalize_skill(value)
+                    masks[key] = masks.get(key, 0) | 1 << i
+
+    @property
+    def chats(self):
+        """Every destination chat, in the order of its first rule."""
+        return list(dict.fromkeys(self.chat_ids))
+
+    def match(self, primary_profession, seniority, location, skill_names):
+        """Return the chat ids (without duplicates) a candidate goes to."""
+        matched = self._all
+        candidate = {
+            'primaryProfession': [primary_profession],
+            'seniority': [seniority],
+            'location': [location],
+            'skills': skill_names or [],
+        }
+        for field in ROUTING_FIELDS:
+            masks = self._masks[field]
+            field_matches = self._wildcard[field]
+            for value in candidate[field]:
+                if value:
+                    field_matches |= masks.get(normalize_skill(value), 0)
+            matched &= field_matches
+            if not matched:
+                return []
+        chats = []
+        while matched:
+            i = (matched & -matched).bit_length() - 1
+            if self.chat_ids[i] not in chats:
+                chats.append(self.chat_ids[i])
+            matched &= matched - 1
+        return chats
+
+    def route(self, row):
+        """match() for an (id, *ROUTING_ROW_COLUMNS) summary row."""
+        return self.match(*row[1:5])
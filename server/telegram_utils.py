@@ -0,0 +1,163 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TelegramError(Exception):
+    """A sendMessage call that failed for good (or ran out of retries)."""
+
+    def __init__(self, description, error_code=None):
+        super().__init__(description)
+        self.error_code = error_code
+
+
+class TokenBucket:
+    """Allows rate events per second with bursts of up to capacity.
+
+    acquire() blocks until a token is free. pause() stops handing out tokens
+    until a point in time, which is how a Telegram retry_after is honoured
+    by every sender sharing the bucket, not only the one that got the 429.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+
+class TelegramSender:
+    """sendMessage over one keep-alive session, within Telegram's limits.
+
+    Every message takes a token from its chat's bucket (private chats
+    chat_rate per second, groups group_rate_per_minute) and then from the
+    global bucket. Up to max_concurrency requests are in flight; submit()
+    blocks once max_pending messages are queued. A 429 pauses the chat's
+    bucket for retry_after seconds and the message is retried; network
+    errors and 5xx responses are retried with exponential backoff. Other
+    errors (bad Markdown, unknown chat) are not retried.
+    """
+
+    def __init__(self, token, api_url="https://api.telegram.org", global_rate=30.0, chat_rate=1.0,
+                 group_rate_per_minute=20.0, max_concurrency=8, max_pending=None, max_retries=5,
+                 timeout=10.0, backoff=0.5, max_backoff=30.0):
+        self.url = f"{api_url.rstrip('/')}/bot{token}/sendMessage"
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate_per_minute / 60.0
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.global_bucket = TokenBucket(global_rate)
+        self._chat_buckets = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="telegram-sender")
+        self._pending = threading.BoundedSemaphore(max_pending or max_concurrency * 4)
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.throttled = 0
+
+    def chat_bucket(self, chat_id):
+        with self._lock:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                # Group and channel ids are negative.
+                is_group = str(chat_id).startswith("-")
+                bucket = TokenBucket(self.group_rate if is_group else self.chat_rate)
+                self._chat_buckets[chat_id] = bucket
+            return bucket
+
+    def set_chat_rate(self, chat_id, rate):
+        """Send to chat_id at rate messages per second instead of the
+        private or group default."""
+        with self._lock:
+            self._chat_buckets[chat_id] = TokenBucket(rate)
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def send_message(self, chat_id, text, parse_mode="Markdown"):
+        """Send one message, blocking until it is delivered; returns the
+        Message object from Telegram or raises TelegramError."""
+        chat_bucket = self.chat_bucket(chat_id)
+        payload = {"chat_id": chat_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+
+        attempt = 0
+        while True:
+            chat_bucket.acquire()
+            self.global_bucket.acquire()
+            try:
+                resp = self.session.post(self.url, data=payload, timeout=self.timeout)
+                body = resp.json()
+            except (requests.RequestException, ValueError) as e:
+                resp, body = None, {"description": str(e)}
+
+            if resp is not None and body.get("ok"):
+                self._count("sent")
+                return body["result"]
+
+            error_code = body.get("error_code", resp.status_code if resp is not None else None)
+            retry_after = (body.get("parameters") or {}).get("retry_after")
+            retryable = resp is None or error_code == 429 or error_code >= 500
+            if not retryable or attempt >= self.max_retries:
+                self._count("failed")
+                raise TelegramError(body.get("description", "sendMessage failed"), error_code)
+
+            attempt += 1
+            self._count("retries")
+            if retry_after is not None:
+                self._count("throttled")
+                chat_bucket.pause(retry_after)
+            else:
+                delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+                time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def submit(self, chat_id, text, parse_mode="Markdown"):
+        """Queue a message for sending; returns a Future of send_message."""
+        self._pending.acquire()
+        try:
+            future = self._executor.submit(self.send_message, chat_id, text, parse_mode)
+        except BaseException:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def stats(self):
+        with self._lock:
+            return {"sent": self.sent, "failed": self.failed, "retries": self.retries, "throttled": self.throttled}
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The server modules import each other by name, as they do when run from server/.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'server')))
+# So are the tools/db scripts, which add server/ to the path themselves.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools', 'db')))
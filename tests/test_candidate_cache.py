@@ -0,0 +1,127 @@
+import json
+
+from index_utils import CandidateCache
+
+
+class FakeChanges:
+    """Stands in for ChangeListener without a LISTEN connection."""
+
+    def __init__(self, connected=True):
+        self.connected = connected
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def publish(self, candidate_id):
+        for callback in self._subscribers:
+            callback(candidate_id)
+
+
+class FakeDatabase:
+    def __init__(self, rows):
+        self.rows = rows
+        self.fetches = 0
+        self.during_fetch = None
+
+    def fetch_candidate_by_id(self, candidate_id):
+        self.fetches += 1
+        if self.during_fetch:
+            self.during_fetch()
+        return self.rows.get(candidate_id)
+
+
+def cv(name):
+    return {"candidate": {"fullName": name}}
+
+
+def size(data):
+    return len(json.dumps(data, separators=(",", ":")))
+
+
+def test_serves_repeat_reads_from_memory():
+    db = FakeDatabase({1: cv("Dana Levi")})
+    cache = CandidateCache(db, FakeChanges())
+    assert cache.get(1) == cv("Dana Levi")
+    assert cache.get(1) == cv("Dana Levi")
+    assert cache.get(2) is None
+    assert cache.get(2) is None
+    assert db.fetches == 3
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 3, 1)
+
+
+def test_caches_nothing_while_disconnected():
+    db = FakeDatabase({1: cv("Dana Levi")})
+    cache = CandidateCache(db, FakeChanges(connected=False))
+    cache.get(1)
+    cache.get(1)
+    assert db.fetches == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_change_drops_entry():
+    db = FakeDatabase({1: cv("Dana Levi"), 2: cv("Jon Smith")})
+    changes = FakeChanges()
+    cache = CandidateCache(db, changes)
+    cache.get(1)
+    cache.get(2)
+    db.rows[1] = cv("Dana Cohen")
+    changes.publish(1)
+    assert cache.get(1) == cv("Dana Cohen")
+    assert cache.get(2) == cv("Jon Smith")
+    assert db.fetches == 3
+
+
+def test_unknown_change_clears_everything():
+    db = FakeDatabase({1: cv("Dana Levi"), 2: cv("Jon Smith")})
+    changes = FakeChanges()
+    cache = CandidateCache(db, changes)
+    cache.get(1)
+    cache.get(2)
+    changes.publish(None)
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_change_during_fetch_is_not_cached():
+    db = FakeDatabase({1: cv("Dana Levi")})
+    changes = FakeChanges()
+    cache = CandidateCache(db, changes)
+    db.during_fetch = lambda: changes.publish(1)
+    cache.get(1)
+    assert cache.stats()["entries"] == 0
+
+
+def test_evicts_least_recently_used_beyond_max_bytes():
+    rows = {i: cv(f"Candidate {i}") for i in range(1, 4)}
+    db = FakeDatabase(rows)
+    cache = CandidateCache(db, FakeChanges(), max_bytes=2 * size(rows[1]))
+    cache.get(1)
+    cache.get(2)
+    cache.get(1)
+    cache.get(3)
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"]) == (2, 1)
+    fetches = db.fetches
+    cache.get(1)
+    cache.get(3)
+    assert db.fetches == fetches
+    cache.get(2)
+    assert db.fetches == fetches + 1
+
+
+def test_skips_entries_larger_than_max_bytes():
+    db = FakeDatabase({1: cv("Dana Levi")})
+    cache = CandidateCache(db, FakeChanges(), max_bytes=10)
+    assert cache.get(1) == cv("Dana Levi")
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_expire_after_ttl():
+    db = FakeDatabase({1: cv("Dana Levi")})
+    cache = CandidateCache(db, FakeChanges(), ttl=0)
+    cache.get(1)
+    cache.get(1)
+    assert db.fetches == 2
+    assert cache.stats()["expirations"] == 1
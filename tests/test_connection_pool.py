@@ -0,0 +1,129 @@
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+import db_utils
+from db_utils import ConnectionPool, PoolTimeout
+
+
+IDLE = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+INTRANS = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, vars=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.status = IDLE
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        if self.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.status = IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    opened = []
+
+    def connect(**kwargs):
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(db_utils.psycopg2, "connect", connect)
+    return opened
+
+
+def test_opens_min_size_on_first_checkout(connections):
+    pool = ConnectionPool({}, min_size=2, max_size=4)
+    conn = pool.getconn()
+    assert len(connections) == 2
+    assert pool.stats()["size"] == 2
+    assert pool.stats()["in_use"] == 1
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+
+
+def test_times_out_at_max_size(connections):
+    pool = ConnectionPool({}, min_size=0, max_size=1, timeout=0.05)
+    pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_rolls_back_open_transaction_on_return(connections):
+    pool = ConnectionPool({}, min_size=1, max_size=2)
+    conn = pool.getconn()
+    conn.status = INTRANS
+    pool.putconn(conn)
+    assert conn.status == IDLE
+    assert pool.getconn() is conn
+
+
+def test_replaces_connection_closed_while_checked_out(connections):
+    pool = ConnectionPool({}, min_size=1, max_size=2)
+    conn = pool.getconn()
+    conn.close()
+    pool.putconn(conn)
+    stats = pool.stats()
+    assert (stats["size"], stats["idle"], stats["connections_recycled"]) == (1, 1, 1)
+    assert pool.getconn() is connections[1]
+
+
+def test_replaces_broken_idle_connection(connections):
+    pool = ConnectionPool({}, min_size=1, max_size=2, check_after=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.broken = True
+    assert pool.getconn() is connections[1]
+    assert conn.closed
+    assert pool.stats()["size"] == 1
+
+
+def test_refill_gives_up_while_database_is_down(connections, monkeypatch):
+    pool = ConnectionPool({}, min_size=1, max_size=2)
+    conn = pool.getconn()
+
+    def refuse(**kwargs):
+        raise psycopg2.OperationalError("could not connect to server")
+
+    monkeypatch.setattr(db_utils.psycopg2, "connect", refuse)
+    conn.close()
+    pool.putconn(conn)
+    assert pool.stats()["size"] == 0
+
+
+def test_starts_over_after_fork(connections):
+    pool = ConnectionPool({}, min_size=1, max_size=2)
+    inherited = pool.getconn()
+    pool.putconn(inherited)
+    pool._pid = -1  # as if getconn now ran in a forked child
+    conn = pool.getconn()
+    assert conn is connections[1]
+    assert not inherited.closed
+    assert pool.stats()["connections_created"] == 1
@@ -0,0 +1,38 @@
+import json
+import re
+
+import pytest
+
+from db_utils import _copy_text
+
+
+COPY_UNESCAPES = {"\\": "\\", "t": "\t", "n": "\n", "r": "\r"}
+
+
+def read_copy_field(field):
+    """Decode a field the way COPY ... FROM (FORMAT text) does."""
+    if field == "\\N":
+        return None
+    return re.sub(r"\\(.)", lambda m: COPY_UNESCAPES[m.group(1)], field)
+
+
+def test_escapes():
+    assert _copy_text(None) == "\\N"
+    assert _copy_text(42) == "42"
+    assert _copy_text("a\tb\nc\rd\\e") == "a\\tb\\nc\\rd\\\\e"
+    # A literal \N must not turn into NULL.
+    assert _copy_text("\\N") == "\\\\N"
+
+
+@pytest.mark.parametrize("value", [
+    "plain",
+    "",
+    "\\N",
+    "C:\\cvs\\new\\résumé.pdf",
+    "line one\nline two\r\n\ttabbed",
+    json.dumps({"summary": "Go\tPython\nC\\C++ \"lead\""}, ensure_ascii=False),
+])
+def test_fields_round_trip(value):
+    field = _copy_text(value)
+    assert not set(field) & {"\t", "\n", "\r"}
+    assert read_copy_field(field) == value
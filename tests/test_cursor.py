@@ -0,0 +1,62 @@
+import base64
+import json
+
+import pytest
+from werkzeug.exceptions import BadRequest
+
+from card_info_server import app, decode_cursor, encode_cursor
+from db_utils import Database
+
+
+@pytest.fixture(autouse=True)
+def request_context():
+    with app.test_request_context():
+        yield
+
+
+def raw_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize('sort, descending, after, profession', [
+    ('id', False, (None, 42), None),
+    ('id', False, (None, 42), 'Designer'),
+    ('fullName', True, ('Zoë Cohen', 7), None),
+    ('primaryProfession', False, ('Backend Developer', 3), 'Backend Developer'),
+])
+def test_round_trip(sort, descending, after, profession):
+    token = encode_cursor(sort, descending, after, profession)
+    assert '=' not in token
+    assert decode_cursor(token, sort, descending, profession) == after
+
+
+@pytest.mark.parametrize('sort, descending, profession', [
+    ('fullName', False, None),
+    ('id', True, None),
+    ('id', False, 'Designer'),
+])
+def test_rejects_cursor_for_other_query(sort, descending, profession):
+    token = encode_cursor('id', False, (None, 42))
+    with pytest.raises(BadRequest):
+        decode_cursor(token, sort, descending, profession)
+
+
+@pytest.mark.parametrize('token, sort', [
+    ('not a cursor!', 'id'),
+    (raw_cursor(['id', False, None, 42]), 'id'),
+    (raw_cursor(['id', False, None, '42', None]), 'id'),
+    (raw_cursor(['id', False, None, True, None]), 'id'),
+    (raw_cursor(['fullName', False, 5, 42, None]), 'fullName'),
+    (raw_cursor(['fullName', False, None, 42, None]), 'fullName'),
+    (raw_cursor(['fullName', False, ['a'], 42, None]), 'fullName'),
+    (raw_cursor(['primaryProfession', False, {'a': 1}, 42, None]), 'primaryProfession'),
+])
+def test_rejects_malformed_cursor(token, sort):
+    with pytest.raises(BadRequest):
+        decode_cursor(token, sort, False)
+
+
+@pytest.mark.parametrize('sort', Database.CANDIDATE_SORT_KEYS)
+def test_every_sort_key_round_trips(sort):
+    after = (None, 42) if sort == 'id' else ('Dana Levi', 42)
+    assert decode_cursor(encode_cursor(sort, False, after), sort, False) == after
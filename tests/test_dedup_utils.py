@@ -0,0 +1,49 @@
+from dedup_utils import cv_features, minhash_signature, near_duplicate_clusters
+
+
+def cv(name, skills, companies=()):
+    return {
+        "candidate": {"fullName": name},
+        "skills": [{"name": skill} for skill in skills],
+        "experience": [{"companyName": company, "title": "Engineer"} for company in companies],
+    }
+
+
+SKILLS = ["Python", "SQL", "Docker", "Kubernetes", "AWS", "Linux", "Git", "Redis"]
+
+
+def signatures(cvs):
+    return [(row_id, minhash_signature(cv_features(data))) for row_id, data in cvs]
+
+
+def test_near_duplicates_cluster_under_oldest_id():
+    clusters = near_duplicate_clusters(signatures([
+        (1, cv("Jonathan Smith", SKILLS, ["Acme"])),
+        (2, cv("Dana Levi", ["Photoshop", "Figma", "Illustrator"], ["Studio"])),
+        (3, cv("Jon Smith", SKILLS, ["Acme"])),
+    ]))
+    assert len(clusters) == 1
+    keep_id, members = clusters[0]
+    assert keep_id == 1
+    assert list(members) == [3]
+    assert members[3] >= 0.6
+
+
+def test_different_people_do_not_cluster():
+    clusters = near_duplicate_clusters(signatures([
+        (1, cv("Jon Smith", SKILLS[:4], ["Acme"])),
+        (2, cv("Jon Smith", ["Photoshop", "Figma", "Illustrator", "Sketch"], ["Studio"])),
+    ]))
+    assert clusters == []
+
+
+def test_empty_cvs_do_not_cluster():
+    assert cv_features({}) == set()
+    assert minhash_signature(set()) == []
+    clusters = near_duplicate_clusters(signatures([
+        (1, {}),
+        (2, {"skills": []}),
+        (3, None),
+        (4, cv("Jon Smith", SKILLS)),
+    ]))
+    assert clusters == []
@@ -0,0 +1,55 @@
+from index_utils import SkillIndex, bitmap_from_ids, bitmap_ids
+
+
+class FakeDatabase:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetch_skill_names_after(self, after):
+        return [row for row in self.rows if row[0] > after]
+
+
+def test_bitmap_ids():
+    bitmap = bitmap_from_ids([0, 3, 64, 65, 200])
+    assert bitmap_ids(bitmap) == [0, 3, 64, 65, 200]
+    assert bitmap_ids(bitmap, start=4) == [64, 65, 200]
+    assert bitmap_ids(bitmap, start=65, limit=1) == [65]
+    assert bitmap_ids(bitmap, start=201) == []
+    assert bitmap_ids(0) == []
+
+
+def test_query():
+    index = SkillIndex(FakeDatabase([
+        (1, ['Python', 'SQL']),
+        (2, ['python ', 'Go']),
+        (3, ['Go']),
+        (5, None),
+        (8, ['SQL', 'Rust']),
+    ]))
+    assert bitmap_ids(index.query()) == [1, 2, 3, 5, 8]
+    assert bitmap_ids(index.query(all_of=['PYTHON'])) == [1, 2]
+    assert bitmap_ids(index.query(all_of=['python', 'sql'])) == [1]
+    assert bitmap_ids(index.query(any_of=['go', 'rust'])) == [2, 3, 8]
+    assert bitmap_ids(index.query(any_of=['go', 'sql'], none_of=['python'])) == [3, 8]
+    assert bitmap_ids(index.query(all_of=['cobol'])) == []
+
+
+def test_query_picks_up_new_rows():
+    db = FakeDatabase([(1, ['Go'])])
+    index = SkillIndex(db, refresh_interval=0)
+    assert bitmap_ids(index.query(all_of=['go'])) == [1]
+    db.rows.append((4, ['Go']))
+    assert bitmap_ids(index.query(all_of=['go'])) == [1, 4]
+
+
+def test_invalidate_rebuilds_after_refresh_interval():
+    db = FakeDatabase([(1, ['Go']), (2, ['Go'])])
+    index = SkillIndex(db, refresh_interval=60)
+    assert bitmap_ids(index.query(all_of=['go'])) == [1, 2]
+    db.rows[0] = (1, ['Rust'])
+    index.invalidate()
+    # Too soon after the last load: still the old postings.
+    assert bitmap_ids(index.query(all_of=['go'])) == [1, 2]
+    index.refresh_interval = 0
+    assert bitmap_ids(index.query(all_of=['go'])) == [2]
+    assert bitmap_ids(index.query(all_of=['rust'])) == [1]
@@ -0,0 +1,53 @@
+import json
+
+import ingest_cvs
+
+
+class FakeDatabase:
+    """Keeps loaded rows in a list and skips them like copy_upsert_profiles."""
+
+    def __init__(self):
+        self.rows = []
+
+    def copy_upsert_profiles(self, rows, skip_existing_files=False):
+        inserted = 0
+        for row in rows:
+            row_id, _, file_name, _ = row
+            if (skip_existing_files and row_id is None and file_name is not None
+                    and any(loaded[2] == file_name for loaded in self.rows)):
+                continue
+            self.rows.append(row)
+            inserted += 1
+        return inserted, 0
+
+
+def cv(name):
+    return {"candidate": {"fullName": name}}
+
+
+def test_ndjson_lines_load_with_skip_existing_files(tmp_path, monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(ingest_cvs, "Database", lambda db_config: db)
+    path = tmp_path / "cvs.ndjson"
+    lines = [cv("Dana Levi"), cv("Jon Smith"), cv("Noa Cohen"),
+             {"data": cv("Avi Mor"), "source_file_name": "avi.pdf"},
+             {"data": cv("Avi Mor"), "source_file_name": "avi.pdf"}]
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines), encoding="utf-8")
+
+    ingest_cvs.ingest([str(path)], batch_size=2, workers=1, source="test", skip_existing_files=True)
+
+    assert len(db.rows) == 4
+    assert [row[2] for row in db.rows] == [None, None, None, "avi.pdf"]
+
+
+def test_json_files_are_named_after_the_file(tmp_path, monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(ingest_cvs, "Database", lambda db_config: db)
+    for directory in ("a", "b"):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "cv.json").write_text(json.dumps(cv(directory)), encoding="utf-8")
+
+    ingest_cvs.ingest([str(tmp_path / "a"), str(tmp_path / "b")], batch_size=10, workers=1,
+                      source="test", skip_existing_files=True)
+
+    assert [(row[1], row[2]) for row in db.rows] == [("test", "cv.json")]
@@ -0,0 +1,69 @@
+import gzip
+import time
+
+import pytest
+
+from index_utils import PayloadSnapshot, brotli
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.version = 1
+
+    def fetch_data_version(self):
+        return self.version, f"changed-{self.version}"
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail("timed out")
+        time.sleep(0.01)
+
+
+def test_builds_every_encoding_once_per_version():
+    db = FakeDatabase()
+    bodies = []
+
+    def build():
+        bodies.append(f'{{"version": {db.version}}}'.encode())
+        return bodies[-1]
+
+    snapshot = PayloadSnapshot(db, build, check_interval=0.01)
+    wait_for(lambda: snapshot.current() is not None)
+    version, changed_at, variants = snapshot.current()
+    assert (version, changed_at) == (1, "changed-1")
+    assert variants['identity'] == b'{"version": 1}'
+    assert gzip.decompress(variants['gzip']) == b'{"version": 1}'
+    if brotli is not None:
+        assert brotli.decompress(variants['br']) == b'{"version": 1}'
+    else:
+        assert 'br' not in variants
+
+    time.sleep(0.1)
+    assert snapshot.builds == 1
+
+    db.version = 2
+    wait_for(lambda: snapshot.current()[0] == 2)
+    assert snapshot.current()[2]['identity'] == b'{"version": 2}'
+    assert snapshot.builds == 2
+
+
+def test_keeps_last_snapshot_when_build_fails():
+    db = FakeDatabase()
+    calls = []
+
+    def build():
+        calls.append(db.version)
+        if db.version == 2:
+            raise RuntimeError("database went away")
+        return b"[]"
+
+    snapshot = PayloadSnapshot(db, build, check_interval=0.01)
+    wait_for(lambda: snapshot.current() is not None)
+    db.version = 2
+    wait_for(lambda: calls.count(2) >= 2)
+    assert snapshot.current()[0] == 1
+    db.version = 3
+    wait_for(lambda: snapshot.current()[0] == 3)
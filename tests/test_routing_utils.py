@@ -0,0 +1,53 @@
+import pytest
+
+from routing_utils import RoutingMatcher
+
+
+RULES = [
+    {'chat_id': 'backend', 'primaryProfession': 'Backend Developer', 'skills': ['Python', 'Go']},
+    {'chat_id': 'seniors', 'seniority': ['Senior', 'Lead'], 'location': 'Tel Aviv'},
+    {'chat_id': 'backend', 'skills': 'Rust'},
+    {'chat_id': 'everyone'},
+]
+
+
+def test_match_every_named_field():
+    matcher = RoutingMatcher(RULES)
+    assert matcher.match('Backend Developer', 'Junior', 'Haifa', ['python']) == ['backend', 'everyone']
+    assert matcher.match('Designer', 'senior', 'tel  aviv', []) == ['seniors', 'everyone']
+    # Profession matches but no listed skill does.
+    assert matcher.match('Backend Developer', 'Junior', 'Haifa', ['Java']) == ['everyone']
+
+
+def test_match_lists_each_chat_once():
+    matcher = RoutingMatcher(RULES)
+    assert matcher.match('Backend Developer', 'Lead', 'Tel Aviv', ['Go', 'Rust']) == ['backend', 'seniors', 'everyone']
+
+
+def test_match_missing_values():
+    matcher = RoutingMatcher(RULES[:2])
+    assert matcher.match(None, None, None, None) == []
+    assert RoutingMatcher(RULES[3:]).match(None, None, None, None) == ['everyone']
+
+
+def test_route_reads_summary_row():
+    matcher = RoutingMatcher(RULES[:1])
+    assert matcher.route((7, 'Backend Developer', 'Mid', 'Remote', ['Go'])) == ['backend']
+
+
+def test_chats_in_rule_order():
+    assert RoutingMatcher(RULES).chats == ['backend', 'seniors', 'everyone']
+
+
+@pytest.mark.parametrize('rule', [
+    {'skills': ['Python']},
+    {'chat_id': 1, 'team': 'x'},
+    {'chat_id': 1, 'location': 5},
+    {'chat_id': 1, 'skills': [1]},
+    {'chat_id': 1, 'skills': []},
+    {'chat_id': 1, 'seniority': ' '},
+    {'chat_id': 1, 'primaryProfession': {'name': 'Dev'}},
+])
+def test_invalid_rules(rule):
+    with pytest.raises(ValueError, match=r'Invalid routing rule 1: '):
+        RoutingMatcher([{'chat_id': 0}, rule])
@@ -0,0 +1,124 @@
+import time
+
+import pytest
+import requests
+
+from telegram_utils import TelegramError, TelegramSender, TokenBucket
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class FakeSession:
+    """Answers each post with the next queued response (or raises it)."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.posts = []
+
+    def post(self, url, data, timeout):
+        self.posts.append(data)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def close(self):
+        pass
+
+
+def ok(message_id):
+    return FakeResponse(200, {"ok": True, "result": {"message_id": message_id}})
+
+
+def error(status, description, retry_after=None):
+    body = {"ok": False, "error_code": status, "description": description}
+    if retry_after is not None:
+        body["parameters"] = {"retry_after": retry_after}
+    return FakeResponse(status, body)
+
+
+def sender(*responses, **kwargs):
+    kwargs = {"global_rate": 1000, "chat_rate": 1000, "backoff": 0, **kwargs}
+    telegram = TelegramSender("token", **kwargs)
+    telegram.session = FakeSession(*responses)
+    return telegram
+
+
+def test_bucket_allows_burst_then_rate():
+    bucket = TokenBucket(rate=50, capacity=2)
+    start = time.monotonic()
+    for _ in range(2):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.01
+    for _ in range(3):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.05
+
+
+def test_bucket_pause_holds_every_acquire():
+    bucket = TokenBucket(rate=1000, capacity=5)
+    bucket.pause(0.05)
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.05
+
+
+def test_send_message():
+    telegram = sender(ok(7))
+    assert telegram.send_message("42", "*hi*") == {"message_id": 7}
+    assert telegram.session.posts == [{"chat_id": "42", "text": "*hi*", "parse_mode": "Markdown"}]
+    assert telegram.stats() == {"sent": 1, "failed": 0, "retries": 0, "throttled": 0}
+
+
+def test_retry_after_pauses_chat_and_retries():
+    telegram = sender(error(429, "Too Many Requests", retry_after=0.05), ok(8))
+    start = time.monotonic()
+    assert telegram.send_message("42", "hi") == {"message_id": 8}
+    assert time.monotonic() - start >= 0.05
+    assert telegram.stats() == {"sent": 1, "failed": 0, "retries": 1, "throttled": 1}
+
+
+def test_network_errors_and_5xx_are_retried():
+    telegram = sender(requests.ConnectionError("reset"), error(502, "Bad Gateway"), ok(9))
+    assert telegram.send_message("42", "hi") == {"message_id": 9}
+    assert telegram.stats()["retries"] == 2
+
+
+def test_gives_up_after_max_retries():
+    telegram = sender(*[error(500, "Internal Server Error")] * 3, max_retries=2)
+    with pytest.raises(TelegramError) as e:
+        telegram.send_message("42", "hi")
+    assert e.value.error_code == 500
+    assert telegram.stats() == {"sent": 0, "failed": 1, "retries": 2, "throttled": 0}
+
+
+def test_client_errors_are_not_retried():
+    telegram = sender(error(400, "Bad Request: can't parse entities"))
+    with pytest.raises(TelegramError) as e:
+        telegram.send_message("42", "*unclosed")
+    assert e.value.error_code == 400
+    assert str(e.value) == "Bad Request: can't parse entities"
+    assert len(telegram.session.posts) == 1
+
+
+def test_chat_buckets():
+    telegram = sender(chat_rate=2, group_rate_per_minute=30)
+    assert telegram.chat_bucket("42").rate == 2
+    assert telegram.chat_bucket("-1001").rate == 0.5
+    assert telegram.chat_bucket("42") is telegram.chat_bucket("42")
+    telegram.set_chat_rate("42", 5)
+    assert telegram.chat_bucket("42").rate == 5
+
+
+def test_submit_sends_in_background():
+    telegram = sender(ok(1), ok(2))
+    futures = [telegram.submit("42", "one"), telegram.submit("-1001", "two")]
+    assert sorted(future.result()["message_id"] for future in futures) == [1, 2]
+    telegram.close()
@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'server')))
+
+from db_utils import CANDIDATE_SUMMARY_COLUMNS, CANDIDATE_SUMMARY_JSON, RAW_JSON, Database
+from bench_summary_projection import create_bench_tables
+import config
+
+
+def list_decoded(conn):
+    # What /api/candidates did before: rows to dicts to JSON.
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT {CANDIDATE_SUMMARY_COLUMNS} FROM cv_profiles_summary_bench ORDER BY id;")
+        rows = [Database._summary_row(row) for row in cur.fetchall()]
+    return json.dumps(rows, separators=(",", ":")).encode()
+
+
+def list_json_agg(conn):
+    with conn.cursor() as cur:
+        psycopg2.extensions.register_type(RAW_JSON, cur)
+        cur.execute(f"SELECT COALESCE(json_agg({CANDIDATE_SUMMARY_JSON} ORDER BY id), '[]')::text FROM cv_profiles_summary_bench;")
+        return cur.fetchone()[0]
+
+
+def documents_decoded(conn):
+    # Whole CV documents through the default jsonb caster and back out.
+    with conn.cursor() as cur:
+        cur.execute("SELECT data FROM cv_profiles_bench ORDER BY id;")
+        return json.dumps([row[0] for row in cur.fetchall()], separators=(",", ":")).encode()
+
+
+def documents_raw(conn):
+    with conn.cursor() as cur:
+        psycopg2.extensions.register_type(RAW_JSON, cur)
+        cur.execute("SELECT data FROM cv_profiles_bench ORDER BY id;")
+        return b"[" + b",".join(row[0] for row in cur.fetchall()) + b"]"
+
+
+def measure(conn, label, build, repeat):
+    cpu, wall, size = [], [], 0
+    for _ in range(repeat):
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        size = len(build(conn))
+        cpu.append(time.process_time() - cpu_start)
+        wall.append(time.perf_counter() - wall_start)
+    # CPU is this process only: the work a web worker does per request.
+    print(f"{label:<20} | {size / 1024 / 1024:>8.2f} MiB | {min(cpu) * 1000:>10.1f} ms | {min(wall) * 1000:>10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Python CPU per response for decoded and passed-through JSON.")
+    parser.add_argument("--rows", type=int, default=20000, help="Number of synthetic rows to generate.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per variant; the fastest is reported.")
+    args = parser.parse_args()
+
+    random.seed(0)
+    conn = psycopg2.connect(**config.DB_CONFIG)
+    try:
+        with conn.cursor() as cur:
+            create_bench_tables(cur, args.rows)
+
+        print(f"{'Response':<20} | {'Size':>12} | {'Python CPU':>13} | {'Wall':>13}")
+        print("-" * 68)
+        measure(conn, "list decoded", list_decoded, args.repeat)
+        measure(conn, "list json_agg", list_json_agg, args.repeat)
+        measure(conn, "documents decoded", documents_decoded, args.repeat)
+        measure(conn, "documents raw", documents_raw, args.repeat)
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import psycopg2
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'server')))
+
+from db_utils import CANDIDATE_SUMMARY_COLUMNS
+import config
+
+# The jsonb_build_object projection the list endpoint used before it moved to
+# cv_profiles_summary.
+PROJECTION_SQL = """jsonb_build_object(
+    'candidate', jsonb_build_object(
+        'fullName', COALESCE(data->'candidate'->'fullName', '"N/A"'),
+        'primaryProfession', COALESCE(data->'candidate'->'primaryProfession', '"N/A"'),
+        'location', COALESCE(data->'candidate'->'location', '"N/A"'),
+        'seniority', COALESCE(data->'candidate'->'seniority', '"N/A"'),
+        'department', COALESCE(data->'candidate'->'department', '"N/A"')
+    ),
+    'skills', COALESCE(data->'skills', '[]')
+)"""
+
+WORDS = "python react kubernetes docker team lead backend frontend data pipeline cloud api".split()
+
+
+def synthetic_cv(i):
+    return {
+        "candidate": {
+            "fullName": f"Candidate {i}",
+            "primaryProfession": random.choice(["Backend Engineer", "Frontend Engineer", "Data Scientist"]),
+            "location": random.choice(["Tel Aviv", "Berlin", "New York"]),
+            "seniority": random.choice(["Junior", "Mid", "Senior"]),
+            "department": "R&D",
+        },
+        "skills": [{"name": w, "level": "Advanced"} for w in random.sample(WORDS, 6)],
+        "experience": [
+            {
+                "title": "Software Engineer",
+                "companyName": f"Company {j}",
+                "startDate": "2019-01",
+                "endDate": "2022-06",
+                "description": " ".join(random.choices(WORDS, k=120)),
+            }
+            for j in range(4)
+        ],
+        "education": [{"degreeType": "BSc", "fieldOfStudy": "Computer Science", "institution": "University"}],
+    }
+
+
+def create_bench_tables(cur, rows):
+    """Fill temp tables cv_profiles_bench with rows synthetic CVs and
+    cv_profiles_summary_bench with their cv_profiles_summary columns."""
+    cur.execute("CREATE TEMP TABLE cv_profiles_bench (id SERIAL PRIMARY KEY, data JSONB);")
+    print(f"Generating {rows} synthetic rows...")
+    for start in range(0, rows, 1000):
+        batch = [(json.dumps(synthetic_cv(i)),) for i in range(start, min(start + 1000, rows))]
+        cur.executemany("INSERT INTO cv_profiles_bench (data) VALUES (%s);", batch)
+    cur.execute("""
+        CREATE TEMP TABLE cv_profiles_summary_bench AS
+        SELECT
+            id,
+            data->'candidate'->>'fullName' AS full_name,
+            data->'candidate'->>'primaryProfession' AS primary_profession,
+            data->'candidate'->>'location' AS location,
+            data->'candidate'->>'seniority' AS seniority,
+            data->'candidate'->>'department' AS department,
+            ARRAY(SELECT s->>'name' FROM jsonb_array_elements(data->'skills') s) AS skill_names
+        FROM cv_profiles_bench;
+    """)
+    cur.execute("ANALYZE cv_profiles_bench;")
+    cur.execute("ANALYZE cv_profiles_summary_bench;")
+
+
+def measure(cur, label, select, table="cv_profiles_bench"):
+    # Fetch the JSON as text so transfer and decode can be timed separately.
+    start = time.perf_counter()
+    cur.execute(f"SELECT id, ({select})::text FROM {table} ORDER BY id;")
+    rows = cur.fetchall()
+    fetch_time = time.perf_counter() - start
+
+    transferred = sum(len(text.encode()) for _, text in rows)
+
+    start = time.perf_counter()
+    for _, text in rows:
+        json.loads(text)
+    decode_time = time.perf_counter() - start
+
+    print(f"{label:<12} | {transferred / 1024 / 1024:>10.2f} MiB | {fetch_time * 1000:>10.1f} ms | {decode_time * 1000:>10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fetching whole cv_profiles documents with the SQL summary projection and summary table.")
+    parser.add_argument("--rows", type=int, default=20000, help="Number of synthetic rows to generate.")
+    args = parser.parse_args()
+
+    random.seed(0)
+    conn = psycopg2.connect(**config.DB_CONFIG)
+    try:
+        with conn.cursor() as cur:
+            create_bench_tables(cur, args.rows)
+
+            print(f"{'Query':<12} | {'Transferred':>14} | {'Fetch':>13} | {'Decode':>13}")
+            print("-" * 62)
+            measure(cur, "full data", "data")
+            measure(cur, "projection", PROJECTION_SQL)
+            measure(cur, "summary", f"json_build_array({CANDIDATE_SUMMARY_COLUMNS})", table="cv_profiles_summary_bench")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'server')))
+
+from telegram_utils import TelegramSender
+
+
+class FakeTelegram(ThreadingHTTPServer):
+    """sendMessage endpoint that enforces Telegram-like flood limits.
+
+    More than global_limit messages in any second, or per_chat_limit to one
+    chat, is answered with 429 and a retry_after, like the real API.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, global_limit, per_chat_limit, latency, retry_after):
+        super().__init__(address, FakeTelegramHandler)
+        self.global_limit = global_limit
+        self.per_chat_limit = per_chat_limit
+        self.latency = latency
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.recent = deque()
+        self.recent_by_chat = {}
+        self.accepted = 0
+        self.rejected = 0
+        self.message_id = 0
+
+    def admit(self, chat_id):
+        with self.lock:
+            now = time.monotonic()
+            while self.recent and self.recent[0] <= now - 1:
+                self.recent.popleft()
+            chat = self.recent_by_chat.setdefault(chat_id, deque())
+            while chat and chat[0] <= now - 1:
+                chat.popleft()
+            if len(self.recent) >= self.global_limit or len(chat) >= self.per_chat_limit:
+                self.rejected += 1
+                return None
+            self.recent.append(now)
+            chat.append(now)
+            self.accepted += 1
+            self.message_id += 1
+            return self.message_id
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        chat_id = form["chat_id"][0]
+        time.sleep(self.server.latency)
+        message_id = self.server.admit(chat_id)
+        if message_id is None:
+            status = 429
+            body = {"ok": False, "error_code": 429, "description": "Too Many Requests: retry later",
+                    "parameters": {"retry_after": self.server.retry_after}}
+        else:
+            status = 200
+            body = {"ok": True, "result": {"message_id": message_id, "chat": {"id": int(chat_id)}, "text": form["text"][0]}}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure sustained TelegramSender throughput against a local fake Telegram API.")
+    parser.add_argument("--messages", type=int, default=600, help="Messages to send.")
+    parser.add_argument("--chats", type=int, default=60, help="Distinct private chats the messages are spread over.")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Simulated server latency per request.")
+    parser.add_argument("--concurrency", type=int, default=8, help="TelegramSender max_concurrency.")
+    parser.add_argument("--global-rate", type=float, default=30, help="Sender's global messages per second.")
+    parser.add_argument("--chat-rate", type=float, default=1, help="Sender's messages per second per chat.")
+    parser.add_argument("--server-global-limit", type=int, default=30, help="Fake server's messages per second before 429.")
+    parser.add_argument("--server-chat-limit", type=int, default=1, help="Fake server's messages per second per chat before 429.")
+    args = parser.parse_args()
+
+    server = FakeTelegram(("127.0.0.1", 0), args.server_global_limit, args.server_chat_limit, args.latency_ms / 1000, retry_after=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    sender = TelegramSender("bench", api_url=api_url, global_rate=args.global_rate, chat_rate=args.chat_rate,
+                            max_concurrency=args.concurrency)
+    print(f"Sending {args.messages} messages to {args.chats} chats "
+          f"({args.concurrency} concurrent, {args.latency_ms:.0f} ms latency)...")
+    start = time.perf_counter()
+    futures = [sender.submit(1000 + i % args.chats, f"message {i}") for i in range(args.messages)]
+    for future in futures:
+        future.exception()
+    elapsed = time.perf_counter() - start
+    sender.close()
+    server.shutdown()
+
+    stats = sender.stats()
+    print(f"Delivered {stats['sent']} in {elapsed:.1f}s: {stats['sent'] / elapsed:.1f} messages/s")
+    print(f"Failed {stats['failed']}, retried {stats['retries']} ({stats['throttled']} after 429), "
+          f"server rejected {server.rejected} of {server.accepted + server.rejected} requests")
+
+
+if __name__ == "__main__":
+    main()
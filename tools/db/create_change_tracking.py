@@ -0,0 +1,105 @@
+import sys
+import os
+import psycopg2
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'server')))
+
+import config
+
+def create_change_tracking():
+    conn = None
+    try:
+        print("Connecting to database...")
+        conn = psycopg2.connect(**config.DB_CONFIG)
+        cur = conn.cursor()
+        print("Database connection established. Creating change tracking...")
+
+        # Incremental snapshots export rows with updated_at after the previous
+        # snapshot, so every update has to move it, not only the writers that
+        # remember to set it.
+        cur.execute("""
+            CREATE OR REPLACE FUNCTION cv_profiles_touch_updated_at() RETURNS TRIGGER AS $$
+            BEGIN
+                NEW.updated_at := NOW();
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+        cur.execute("DROP TRIGGER IF EXISTS cv_profiles_touch_updated_at ON cv_profiles;")
+        cur.execute("""
+            CREATE TRIGGER cv_profiles_touch_updated_at
+            BEFORE UPDATE ON cv_profiles
+            FOR EACH ROW EXECUTE FUNCTION cv_profiles_touch_updated_at();
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_cv_profiles_updated_at ON cv_profiles (updated_at);")
+        print("Trigger 'cv_profiles_touch_updated_at' and index 'idx_cv_profiles_updated_at' created.")
+
+        # Deleted rows leave nothing behind to export; record their ids so an
+        # incremental snapshot can carry the deletion.
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS cv_profiles_deleted (
+                id INTEGER PRIMARY KEY,
+                deleted_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+            );
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_cv_profiles_deleted_at ON cv_profiles_deleted (deleted_at);")
+        cur.execute("""
+            CREATE OR REPLACE FUNCTION cv_profiles_record_deleted() RETURNS TRIGGER AS $$
+            BEGIN
+                INSERT INTO cv_profiles_deleted (id)
+                SELECT id FROM deleted_rows
+                ON CONFLICT (id) DO UPDATE SET deleted_at = NOW();
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+        cur.execute("DROP TRIGGER IF EXISTS cv_profiles_record_deleted ON cv_profiles;")
+        cur.execute("""
+            CREATE TRIGGER cv_profiles_record_deleted
+            AFTER DELETE ON cv_profiles
+            REFERENCING OLD TABLE AS deleted_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION cv_profiles_record_deleted();
+        """)
+        print("Table 'cv_profiles_deleted' and trigger 'cv_profiles_record_deleted' created.")
+
+        # A single-row change counter bumped once per writing statement. The
+        # web server reads it to build ETags for /api/candidates, so a repeat
+        # request costs one primary-key lookup. It is updated in the writer's
+        # transaction, so readers never see a version before its data commits.
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS cv_profiles_version (
+                singleton BOOLEAN PRIMARY KEY DEFAULT true CHECK (singleton),
+                version BIGINT NOT NULL DEFAULT 0,
+                changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+            );
+        """)
+        cur.execute("INSERT INTO cv_profiles_version DEFAULT VALUES ON CONFLICT DO NOTHING;")
+        cur.execute("""
+            CREATE OR REPLACE FUNCTION cv_profiles_bump_version() RETURNS TRIGGER AS $$
+            BEGIN
+                UPDATE cv_profiles_version SET version = version + 1, changed_at = NOW();
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+        cur.execute("DROP TRIGGER IF EXISTS cv_profiles_bump_version ON cv_profiles;")
+        cur.execute("""
+            CREATE TRIGGER cv_profiles_bump_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON cv_profiles
+            FOR EACH STATEMENT EXECUTE FUNCTION cv_profiles_bump_version();
+        """)
+        print("Table 'cv_profiles_version' and trigger 'cv_profiles_bump_version' created.")
+
+        conn.commit()
+        print("Change tracking created successfully.")
+
+    except Exception as e:
+        print(f"An error occurred while creating change tracking: {e}")
+    finally:
+        if conn:
+            conn.close()
+            print("Database connection closed.")
+
+if __name__ == "__main__":
+    create_change_tracking()
@@ -1,10 +1,16 @@
+import argparse
 import sys
 import os
 import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+import io
+from contextlib import contextmanager, redirect_stdout
 
 # Add the server directory to the Python path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'server')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'server')))
 
+from db_utils import Database
 import config
 
 def create_indexes():
@@ -15,26 +21,77 @@ def create_indexes():
         cur = conn.cursor()
         print("Database connection established. Creating indexes...")
 
-        # Create index on 'id' column
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_cv_profiles_id ON cv_profiles (id);")
-        print("Index 'idx_cv_profiles_id' created or already exists.")
+        # The primary key already indexes 'id'; this copy only slowed down writes.
+        cur.execute("DROP INDEX IF EXISTS idx_cv_profiles_id;")
+        print("Redundant index 'idx_cv_profiles_id' dropped if it existed.")
+
+        # B-tree indexes matching the expressions Database uses against
+        # cv_profiles_summary (see tools/db/create_summary_table.py).
+        # DISTINCT ON (full_name) in fetch_all_candidates and the
+        # PARTITION BY full_name window in remove_duplicates.
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_cv_profiles_summary_full_name_id
+            ON cv_profiles_summary (full_name, id);
+        """)
+        print("Index 'idx_cv_profiles_summary_full_name_id' created or already exists.")
+
+        # Keyset pages sorted by name or profession in fetch_candidates_page.
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_cv_profiles_summary_sort_full_name
+            ON cv_profiles_summary ((COALESCE(full_name, '')), id);
+        """)
+        print("Index 'idx_cv_profiles_summary_sort_full_name' created or already exists.")
+
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_cv_profiles_summary_sort_primary_profession
+            ON cv_profiles_summary ((COALESCE(primary_profession, '')), id);
+        """)
+        print("Index 'idx_cv_profiles_summary_sort_primary_profession' created or already exists.")
+
+        # Keyset pages filtered to one profession in fetch_candidates_page.
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_cv_profiles_summary_primary_profession_id
+            ON cv_profiles_summary (primary_profession, id);
+        """)
+        print("Index 'idx_cv_profiles_summary_primary_profession_id' created or already exists.")
+
+        cur.execute("ANALYZE cv_profiles_summary;")
+        conn.commit()
 
         # Enable pg_trgm extension for better text search
         cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
-        
-        # Create GIN index on 'data->'candidate'->>'fullName' using gin_trgm_ops
+
+        # search_candidates matches against cv_profiles_summary, so the old
+        # trigram indexes on the JSONB name were never used by any query.
+        cur.execute("DROP INDEX IF EXISTS idx_cv_profiles_full_name;")
+        cur.execute("DROP INDEX IF EXISTS idx_cv_profiles_full_name_lower;")
+        print("Unused JSONB trigram indexes dropped if they existed.")
+
+        # GIN trigram indexes for the word-similarity (<%) matches in
+        # search_candidates. pg_trgm folds case itself, so no LOWER() needed.
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_cv_profiles_summary_full_name_trgm
+            ON cv_profiles_summary USING GIN (full_name gin_trgm_ops);
+        """)
+        print("GIN Index 'idx_cv_profiles_summary_full_name_trgm' created or already exists.")
+
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_cv_profiles_summary_primary_profession_trgm
+            ON cv_profiles_summary USING GIN (primary_profession gin_trgm_ops);
+        """)
+        print("GIN Index 'idx_cv_profiles_summary_primary_profession_trgm' created or already exists.")
+
+        # array_to_string is only STABLE, so index through an IMMUTABLE wrapper.
         cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_cv_profiles_full_name 
-            ON cv_profiles USING GIN ((data->'candidate'->>'fullName') gin_trgm_ops);
+            CREATE OR REPLACE FUNCTION cv_skill_names_text(skill_names TEXT[]) RETURNS TEXT AS $$
+                SELECT array_to_string(skill_names, ' ');
+            $$ LANGUAGE sql IMMUTABLE;
         """)
-        print("GIN Index 'idx_cv_profiles_full_name' created or already exists.")
-        
-        # Create a functional index for case-insensitive search
         cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_cv_profiles_full_name_lower 
-            ON cv_profiles USING GIN (LOWER(data->'candidate'->>'fullName') gin_trgm_ops);
+            CREATE INDEX IF NOT EXISTS idx_cv_profiles_summary_skills_trgm
+            ON cv_profiles_summary USING GIN (cv_skill_names_text(skill_names) gin_trgm_ops);
         """)
-        print("GIN Index 'idx_cv_profiles_full_name_lower' created or already exists.")
+        print("GIN Index 'idx_cv_profiles_summary_skills_trgm' created or already exists.")
 
         conn.commit()
         print("Indexes created successfully.")
@@ -46,5 +103,141 @@ def create_indexes():
             conn.close()
             print("Database connection closed.")
 
+
+class ExplainCursor(psycopg2.extensions.cursor):
+    """Cursor that records the plan of each statement instead of running it."""
+
+    def execute(self, query, vars=None):
+        sql = self.mogrify(query, vars).decode()
+        if self.name:
+            # DECLARE ... CURSOR FOR EXPLAIN is not valid SQL, so explain on a
+            # plain cursor and leave this one with an empty result.
+            with self.connection.cursor() as cur:
+                cur.execute(query, vars)
+            return super().execute("SELECT 1 WHERE false;")
+        super().execute("EXPLAIN (FORMAT JSON) " + sql)
+        self.connection.plans.append((sql, self.fetchone()[0][0]["Plan"]))
+
+
+class ExplainConnection(psycopg2.extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.plans = []
+
+
+class ExplainDatabase(Database):
+    """Database whose queries are planned but never executed.
+
+    EXPLAIN without ANALYZE does not run the statement, so this is safe for
+    remove_duplicates too.
+    """
+
+    def __init__(self, db_config):
+        super().__init__(db_config)
+        self.plans = []
+
+    @contextmanager
+    def db_connection(self):
+        conn = psycopg2.connect(connection_factory=ExplainConnection, cursor_factory=ExplainCursor, **self.db_config)
+        try:
+            with conn.cursor() as cur:
+                # With sequential scans priced out of reach, any Seq Scan left
+                # in a plan means no index can serve that query at all.
+                psycopg2.extensions.cursor.execute(cur, "SET enable_seqscan = off;")
+            yield conn
+        finally:
+            self.plans.extend(conn.plans)
+            conn.rollback()
+            conn.close()
+
+
+def seq_scans(plan):
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def check_query_plans():
+    db = ExplainDatabase(config.DB_CONFIG)
+    sample_id = 1
+
+    # One call per Database read/write method; keep in sync with db_utils.py.
+    checks = [
+        ("fetch_candidate_by_id", lambda: db.fetch_candidate_by_id(sample_id)),
+        ("get_adjacent_candidate_ids", lambda: db.get_adjacent_candidate_ids(sample_id)),
+        ("fetch_candidate_with_nav", lambda: db.fetch_candidate_with_nav(sample_id)),
+        ("fetch_all_candidates", lambda: db.fetch_all_candidates(limit=10)),
+        # Same scan as fetch_all_candidates_json, whose single aggregate row
+        # the explain-only cursor cannot stand in for.
+        ("iter_candidates_json", lambda: list(db.iter_candidates_json())),
+        ("fetch_candidates_page", lambda: [
+            db.fetch_candidates_page(100, after=(sample_id if sort == 'id' else '', sample_id), sort=sort, descending=desc)
+            for sort in db.CANDIDATE_SORT_KEYS for desc in (False, True)
+        ]),
+        ("fetch_candidates_page (profession)", lambda: db.fetch_candidates_page(
+            100, after=(None, sample_id), primary_profession="DevOps")),
+        ("fetch_ids_after", lambda: db.fetch_ids_after(sample_id)),
+        ("fetch_skill_names_after", lambda: db.fetch_skill_names_after(sample_id)),
+        ("fetch_candidates_by_ids", lambda: db.fetch_candidates_by_ids([sample_id])),
+        ("fetch_facet_counts", lambda: db.fetch_facet_counts(sample_id)),
+        ("search_candidates", lambda: db.search_candidates("python", limit=20)),
+        ("full_text_search", lambda: db.full_text_search("kubernetes team lead", limit=20)),
+        ("remove_duplicates", lambda: db.remove_duplicates()),
+        ("remove_duplicates_batch", lambda: db.remove_duplicates_batch(0, 1000)),
+        ("iter_rows_missing_minhash", lambda: list(db.iter_rows_missing_minhash())),
+        ("iter_minhash_signatures", lambda: list(db.iter_minhash_signatures())),
+        ("fetch_data_version", lambda: db.fetch_data_version()),
+        ("iter_profiles_for_export", lambda: list(db.iter_profiles_for_export(sample_id, since="2000-01-01"))),
+        ("iter_deleted_for_export", lambda: list(db.iter_deleted_for_export("2000-01-01"))),
+        ("route_candidates", lambda: db.route_candidates(lambda row: [], 1000)),
+        ("iter_routing_rows", lambda: list(db.iter_routing_rows(sample_id))),
+        ("skip_routing", lambda: db.skip_routing(sample_id)),
+        ("fetch_backlog", lambda: db.fetch_backlog(100)),
+        ("fetch_delivery_stats", lambda: db.fetch_delivery_stats()),
+        ("claim_deliveries", lambda: db.claim_deliveries("0", 20, 300)),
+        ("renew_claims", lambda: db.renew_claims("0", [(sample_id, 1)])),
+        ("record_deliveries", lambda: db.record_deliveries([("0", sample_id, "sent", 1, None, 0)])),
+        ("delete_candidates", lambda: db.delete_candidates([sample_id])),
+    ]
+
+    print("Checking query plans...")
+    failing = skipped = 0
+    for name, call in checks:
+        db.plans = []
+        try:
+            # remove_duplicates reports a row count that means nothing here.
+            with redirect_stdout(io.StringIO()):
+                call()
+        except psycopg2.errors.UndefinedTable as e:
+            # The table comes from a setup script that has not run yet
+            # (see the Database Setup section of GEMINI.md).
+            print(f"  skipped   {name}: {e.diag.message_primary}")
+            skipped += 1
+            continue
+        except Exception as e:
+            print(f"  ERROR {name}: {e}")
+            failing += 1
+            continue
+        scanned = [(sql, seq_scans(plan)) for sql, plan in db.plans]
+        scanned = [(sql, tables) for sql, tables in scanned if tables]
+        if not scanned:
+            print(f"  ok        {name}")
+        for sql, tables in scanned:
+            failing += 1
+            print(f"  SEQ SCAN  {name} on {', '.join(tables)}:")
+            print("            " + " ".join(sql.split()))
+    print(f"{failing} quer{'y' if failing == 1 else 'ies'} without a usable index"
+          + (f", {skipped} skipped." if skipped else "."))
+    return failing
+
+
 if __name__ == "__main__":
-    create_indexes()
+    parser = argparse.ArgumentParser(description="Create cv_profiles indexes and check Database query plans.")
+    parser.add_argument("--check-only", action="store_true", help="Only run the EXPLAIN check, do not create indexes.")
+    args = parser.parse_args()
+    if not args.check_only:
+        create_indexes()
+    sys.exit(1 if check_query_plans() else 0)
@@ -0,0 +1,110 @@
+import sys
+import os
+import psycopg2
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'server')))
+
+from db_utils import CHANGED_CANDIDATE_CHANNEL, NEW_CANDIDATE_CHANNEL
+import config
+
+# Ids per cv_profiles_changed notification; NOTIFY payloads must stay under
+# 8000 bytes.
+IDS_PER_NOTIFY = 500
+
+def create_notify_triggers():
+    conn = None
+    try:
+        print("Connecting to database...")
+        conn = psycopg2.connect(**config.DB_CONFIG)
+        cur = conn.cursor()
+        print("Database connection established. Creating notification triggers...")
+
+        # Wakes up `bot.py --listen` as soon as CVs are inserted. One
+        # notification per statement, however many rows it inserts, with the
+        # highest new id; NOTIFY is only delivered once the insert commits.
+        cur.execute(f"""
+            CREATE OR REPLACE FUNCTION cv_profiles_notify_new() RETURNS TRIGGER AS $$
+            BEGIN
+                PERFORM pg_notify('{NEW_CANDIDATE_CHANNEL}', max(id)::text)
+                FROM inserted_rows
+                HAVING count(*) > 0;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+        cur.execute("DROP TRIGGER IF EXISTS cv_profiles_notify_new ON cv_profiles;")
+        cur.execute("""
+            CREATE TRIGGER cv_profiles_notify_new
+            AFTER INSERT ON cv_profiles
+            REFERENCING NEW TABLE AS inserted_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION cv_profiles_notify_new();
+        """)
+        print(f"Trigger 'cv_profiles_notify_new' created (channel '{NEW_CANDIDATE_CHANNEL}').")
+
+        # Lets the web server drop exactly the cached candidates that changed
+        # and reload its id, facet and skill indexes (see
+        # index_utils.ChangeListener). Each statement sends the old ids,
+        # comma-separated, IDS_PER_NOTIFY at a time. Updates that leave data
+        # alone, like search_vector backfills, stay quiet.
+        cur.execute(f"""
+            CREATE OR REPLACE FUNCTION cv_profiles_notify_changed() RETURNS TRIGGER AS $$
+            BEGIN
+                IF TG_OP = 'TRUNCATE' THEN
+                    PERFORM pg_notify('{CHANGED_CANDIDATE_CHANNEL}', '*');
+                ELSIF TG_OP = 'UPDATE' THEN
+                    PERFORM pg_notify('{CHANGED_CANDIDATE_CHANNEL}', string_agg(id::text, ','))
+                    FROM (
+                        SELECT o.id, (row_number() OVER (ORDER BY o.id) - 1) / {IDS_PER_NOTIFY} AS chunk
+                        FROM old_rows o
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM new_rows n WHERE n.id = o.id AND n.data IS NOT DISTINCT FROM o.data
+                        )
+                    ) changed
+                    GROUP BY chunk;
+                ELSE
+                    PERFORM pg_notify('{CHANGED_CANDIDATE_CHANNEL}', string_agg(id::text, ','))
+                    FROM (
+                        SELECT id, (row_number() OVER (ORDER BY id) - 1) / {IDS_PER_NOTIFY} AS chunk
+                        FROM old_rows
+                    ) deleted
+                    GROUP BY chunk;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+        cur.execute("DROP TRIGGER IF EXISTS cv_profiles_notify_updated ON cv_profiles;")
+        cur.execute("""
+            CREATE TRIGGER cv_profiles_notify_updated
+            AFTER UPDATE ON cv_profiles
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION cv_profiles_notify_changed();
+        """)
+        cur.execute("DROP TRIGGER IF EXISTS cv_profiles_notify_deleted ON cv_profiles;")
+        cur.execute("""
+            CREATE TRIGGER cv_profiles_notify_deleted
+            AFTER DELETE ON cv_profiles
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION cv_profiles_notify_changed();
+        """)
+        cur.execute("DROP TRIGGER IF EXISTS cv_profiles_notify_truncated ON cv_profiles;")
+        cur.execute("""
+            CREATE TRIGGER cv_profiles_notify_truncated
+            AFTER TRUNCATE ON cv_profiles
+            FOR EACH STATEMENT EXECUTE FUNCTION cv_profiles_notify_changed();
+        """)
+        print(f"Triggers 'cv_profiles_notify_updated/deleted/truncated' created (channel '{CHANGED_CANDIDATE_CHANNEL}').")
+
+        conn.commit()
+        print("Notification triggers created successfully.")
+
+    except Exception as e:
+        print(f"An error occurred while creating notification triggers: {e}")
+    finally:
+        if conn:
+            conn.close()
+            print("Database connection closed.")
+
+if __name__ == "__main__":
+    create_notify_triggers()
@@ -0,0 +1,109 @@
+import json
+import sys
+import os
+import psycopg2
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'server')))
+
+import config
+
+def load_last_sent_id():
+    # Candidates up to this id were sent before deliveries were tracked.
+    if os.path.exists(config.TRACK_FILE):
+        with open(config.TRACK_FILE, "r") as f:
+            return json.load(f).get("last_id", 0)
+    return 0
+
+def create_outbox_table():
+    conn = None
+    try:
+        print("Connecting to database...")
+        conn = psycopg2.connect(**config.DB_CONFIG)
+        cur = conn.cursor()
+        print("Database connection established. Creating delivery outbox...")
+
+        # One row per candidate and Telegram chat. bot.py enqueues new
+        # candidates as 'pending', claims them as 'sending' and records
+        # 'sent' with the Telegram message_id, or 'failed' once it gives up.
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS cv_deliveries (
+                chat_id TEXT NOT NULL,
+                candidate_id INTEGER NOT NULL REFERENCES cv_profiles (id) ON DELETE CASCADE,
+                status TEXT NOT NULL DEFAULT 'pending'
+                    CHECK (status IN ('pending', 'sending', 'sent', 'failed')),
+                attempts INTEGER NOT NULL DEFAULT 0,
+                message_id BIGINT,
+                last_error TEXT,
+                next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+                claimed_at TIMESTAMP WITH TIME ZONE,
+                sent_at TIMESTAMP WITH TIME ZONE,
+                created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (chat_id, candidate_id)
+            );
+        """)
+        print("Table 'cv_deliveries' created.")
+
+        # Claims scan only undelivered rows, in id order; sent rows pile up
+        # and must not slow them down.
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_cv_deliveries_undelivered
+            ON cv_deliveries (chat_id, candidate_id)
+            WHERE status IN ('pending', 'sending');
+        """)
+        print("Index 'idx_cv_deliveries_undelivered' created.")
+
+        # New candidates waiting to be routed to chats; bot.py deletes them
+        # as it adds their cv_deliveries rows. Rows are added by a trigger in
+        # the inserting transaction, so a candidate is queued exactly when it
+        # commits; an id above the newest one seen says nothing about lower
+        # ids whose transactions are still open.
+        cur.execute("SELECT to_regclass('cv_deliveries_to_route') IS NULL;")
+        queue_is_new = cur.fetchone()[0]
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS cv_deliveries_to_route (
+                candidate_id INTEGER PRIMARY KEY REFERENCES cv_profiles (id) ON DELETE CASCADE,
+                queued_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+            );
+        """)
+        cur.execute("""
+            CREATE OR REPLACE FUNCTION cv_profiles_queue_delivery() RETURNS TRIGGER AS $$
+            BEGIN
+                INSERT INTO cv_deliveries_to_route (candidate_id)
+                SELECT id FROM inserted_rows
+                ON CONFLICT DO NOTHING;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+        cur.execute("DROP TRIGGER IF EXISTS cv_profiles_queue_delivery ON cv_profiles;")
+        cur.execute("""
+            CREATE TRIGGER cv_profiles_queue_delivery
+            AFTER INSERT ON cv_profiles
+            REFERENCING NEW TABLE AS inserted_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION cv_profiles_queue_delivery();
+        """)
+        print("Table 'cv_deliveries_to_route' and trigger 'cv_profiles_queue_delivery' created.")
+
+        if queue_is_new:
+            # Queue what arrived while nothing was tracking it: candidates
+            # after the last one recorded in last_sent_id.json.
+            cur.execute("""
+                INSERT INTO cv_deliveries_to_route (candidate_id)
+                SELECT id FROM cv_profiles WHERE id > %s
+                ON CONFLICT DO NOTHING;
+            """, (load_last_sent_id(),))
+            print(f"Queued {cur.rowcount} existing candidates for delivery.")
+
+        conn.commit()
+        print("Delivery outbox created successfully.")
+
+    except Exception as e:
+        print(f"An error occurred while creating the delivery outbox: {e}")
+    finally:
+        if conn:
+            conn.close()
+            print("Database connection closed.")
+
+if __name__ == "__main__":
+    create_outbox_table()
@@ -0,0 +1,101 @@
+import argparse
+import sys
+import os
+import psycopg2
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'server')))
+
+import config
+
+SCHEMA_SQL = """
+ALTER TABLE cv_profiles ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+
+-- Joins one text field of every element of a JSONB array, skipping anything
+-- that is not an object with that field.
+CREATE OR REPLACE FUNCTION cv_profiles_array_text(items JSONB, field TEXT) RETURNS TEXT AS $$
+    SELECT COALESCE(string_agg(item->>field, ' '), '')
+    FROM jsonb_array_elements(
+        CASE WHEN jsonb_typeof(items) = 'array' THEN items ELSE '[]'::jsonb END
+    ) AS item
+    WHERE jsonb_typeof(item) = 'object';
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Skill names weigh most, then experience titles, then descriptions.
+CREATE OR REPLACE FUNCTION cv_profiles_search_vector(data JSONB) RETURNS TSVECTOR AS $$
+    SELECT
+        setweight(to_tsvector('english', cv_profiles_array_text(data->'skills', 'name')), 'A') ||
+        setweight(to_tsvector('english', cv_profiles_array_text(data->'experience', 'title')), 'B') ||
+        setweight(to_tsvector('english', cv_profiles_array_text(data->'experience', 'description')), 'C');
+$$ LANGUAGE sql IMMUTABLE;
+
+-- The same text as one document, for ts_headline snippets.
+CREATE OR REPLACE FUNCTION cv_profiles_search_text(data JSONB) RETURNS TEXT AS $$
+    SELECT concat_ws(' ... ',
+        NULLIF(cv_profiles_array_text(data->'skills', 'name'), ''),
+        NULLIF(cv_profiles_array_text(data->'experience', 'title'), ''),
+        NULLIF(cv_profiles_array_text(data->'experience', 'description'), ''));
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION cv_profiles_search_vector_sync() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector := cv_profiles_search_vector(NEW.data);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS cv_profiles_search_vector_sync ON cv_profiles;
+CREATE TRIGGER cv_profiles_search_vector_sync
+    BEFORE INSERT OR UPDATE OF data ON cv_profiles
+    FOR EACH ROW EXECUTE FUNCTION cv_profiles_search_vector_sync();
+"""
+
+
+def create_search_vector(batch_size):
+    conn = None
+    try:
+        print("Connecting to database...")
+        conn = psycopg2.connect(**config.DB_CONFIG)
+        cur = conn.cursor()
+
+        cur.execute(SCHEMA_SQL)
+        conn.commit()
+        print("Column 'search_vector' and its trigger created or already exist.")
+
+        # New writes are covered by the trigger; fill existing rows in small
+        # transactions so the table is never locked for long.
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM cv_profiles;")
+        max_id = cur.fetchone()[0]
+        low = 0
+        total = 0
+        while low < max_id:
+            high = low + batch_size
+            cur.execute("""
+                UPDATE cv_profiles SET search_vector = cv_profiles_search_vector(data)
+                WHERE id > %s AND id <= %s AND search_vector IS NULL;
+            """, (low, high))
+            conn.commit()
+            total += cur.rowcount
+            low = high
+        print(f"Backfilled 'search_vector' for {total} rows.")
+
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_cv_profiles_search_vector
+            ON cv_profiles USING GIN (search_vector);
+        """)
+        conn.commit()
+        print("GIN Index 'idx_cv_profiles_search_vector' created or already exists.")
+
+    except Exception as e:
+        print(f"An error occurred while building the search vector: {e}")
+    finally:
+        if conn:
+            conn.close()
+            print("Database connection closed.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add and backfill the full-text search_vector column on cv_profiles.")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Number of ids backfilled per transaction.")
+    args = parser.parse_args()
+    create_search_vector(args.batch_size)
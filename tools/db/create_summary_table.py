@@ -0,0 +1,144 @@
+import argparse
+import sys
+import os
+import psycopg2
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'server')))
+
+import config
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS cv_profiles_summary (
+    id INTEGER PRIMARY KEY,
+    full_name TEXT,
+    primary_profession TEXT,
+    location TEXT,
+    seniority TEXT,
+    department TEXT,
+    skill_names TEXT[] NOT NULL DEFAULT '{}'
+);
+
+CREATE OR REPLACE FUNCTION cv_profiles_skill_names(data JSONB) RETURNS TEXT[] AS $$
+    SELECT COALESCE(array_agg(skill->>'name' ORDER BY ord), '{}')
+    FROM jsonb_array_elements(
+        CASE WHEN jsonb_typeof(data->'skills') = 'array' THEN data->'skills' ELSE '[]'::jsonb END
+    ) WITH ORDINALITY AS s(skill, ord)
+    WHERE jsonb_typeof(skill) = 'object' AND skill->>'name' IS NOT NULL;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION cv_profiles_summary_sync() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND NEW.id <> OLD.id) THEN
+        DELETE FROM cv_profiles_summary WHERE id = OLD.id;
+        IF TG_OP = 'DELETE' THEN
+            RETURN OLD;
+        END IF;
+    END IF;
+
+    INSERT INTO cv_profiles_summary
+        (id, full_name, primary_profession, location, seniority, department, skill_names)
+    VALUES (
+        NEW.id,
+        NEW.data->'candidate'->>'fullName',
+        NEW.data->'candidate'->>'primaryProfession',
+        NEW.data->'candidate'->>'location',
+        NEW.data->'candidate'->>'seniority',
+        NEW.data->'candidate'->>'department',
+        cv_profiles_skill_names(NEW.data)
+    )
+    ON CONFLICT (id) DO UPDATE SET
+        full_name = EXCLUDED.full_name,
+        primary_profession = EXCLUDED.primary_profession,
+        location = EXCLUDED.location,
+        seniority = EXCLUDED.seniority,
+        department = EXCLUDED.department,
+        skill_names = EXCLUDED.skill_names;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION cv_profiles_summary_truncate() RETURNS TRIGGER AS $$
+BEGIN
+    TRUNCATE cv_profiles_summary;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS cv_profiles_summary_sync ON cv_profiles;
+CREATE TRIGGER cv_profiles_summary_sync
+    AFTER INSERT OR UPDATE OF id, data OR DELETE ON cv_profiles
+    FOR EACH ROW EXECUTE FUNCTION cv_profiles_summary_sync();
+
+DROP TRIGGER IF EXISTS cv_profiles_summary_truncate ON cv_profiles;
+CREATE TRIGGER cv_profiles_summary_truncate
+    AFTER TRUNCATE ON cv_profiles
+    FOR EACH STATEMENT EXECUTE FUNCTION cv_profiles_summary_truncate();
+"""
+
+BACKFILL_SQL = """
+INSERT INTO cv_profiles_summary
+    (id, full_name, primary_profession, location, seniority, department, skill_names)
+SELECT
+    id,
+    data->'candidate'->>'fullName',
+    data->'candidate'->>'primaryProfession',
+    data->'candidate'->>'location',
+    data->'candidate'->>'seniority',
+    data->'candidate'->>'department',
+    cv_profiles_skill_names(data)
+FROM cv_profiles
+WHERE id > %s AND id <= %s
+ON CONFLICT (id) DO UPDATE SET
+    full_name = EXCLUDED.full_name,
+    primary_profession = EXCLUDED.primary_profession,
+    location = EXCLUDED.location,
+    seniority = EXCLUDED.seniority,
+    department = EXCLUDED.department,
+    skill_names = EXCLUDED.skill_names;
+"""
+
+
+def create_summary_table(batch_size):
+    conn = None
+    try:
+        print("Connecting to database...")
+        conn = psycopg2.connect(**config.DB_CONFIG)
+        cur = conn.cursor()
+
+        cur.execute(SCHEMA_SQL)
+        conn.commit()
+        print("Table 'cv_profiles_summary' and its sync triggers created or already exist.")
+
+        # The triggers keep new writes in sync from here on; backfill what is
+        # already there in id ranges so each transaction stays small.
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM cv_profiles;")
+        max_id = cur.fetchone()[0]
+        low = 0
+        total = 0
+        while low < max_id:
+            high = low + batch_size
+            cur.execute(BACKFILL_SQL, (low, high))
+            conn.commit()
+            total += cur.rowcount
+            low = high
+        print(f"Backfilled {total} rows into 'cv_profiles_summary'.")
+
+        # Rows deleted before the triggers existed would otherwise linger.
+        cur.execute("DELETE FROM cv_profiles_summary s WHERE NOT EXISTS (SELECT 1 FROM cv_profiles p WHERE p.id = s.id);")
+        conn.commit()
+        print(f"Removed {cur.rowcount} stale summary rows.")
+
+    except Exception as e:
+        print(f"An error occurred while building the summary table: {e}")
+    finally:
+        if conn:
+            conn.close()
+            print("Database connection closed.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and backfill the cv_profiles_summary table.")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Number of ids backfilled per transaction.")
+    args = parser.parse_args()
+    create_summary_table(args.batch_size)
@@ -0,0 +1,136 @@
+import argparse
+import gzip
+import json
+import sys
+import os
+from datetime import datetime, timedelta
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'server')))
+
+from db_utils import Database
+import config
+
+DEFAULT_STATE_FILE = os.path.join(os.path.dirname(__file__), "snapshot_state.json")
+
+# A transaction can stamp updated_at and commit a little later, after a
+# snapshot has already read past it; incremental exports start this far before
+# the previous snapshot so such rows are exported (again) rather than lost.
+INCREMENTAL_OVERLAP = timedelta(minutes=5)
+
+def open_frame(raw, compression):
+    """Start a new gzip member / zstd frame on the raw output file.
+
+    Each checkpoint closes the current one, so the file up to the recorded
+    offset is always a complete, decodable stream that a resume can append to.
+    """
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+    return gzip.GzipFile(fileobj=raw, mode="wb")
+
+def load_json(path):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return None
+
+def save_json(path, value):
+    # Write then rename, so a crash never leaves a half-written checkpoint.
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(value, f)
+    os.replace(tmp, path)
+
+def export_snapshot(output, compression, incremental, resume, state_file, checkpoint_every, fetch_size):
+    if compression == "zstd" and zstandard is None:
+        print("zstd compression needs the 'zstandard' package (pip install zstandard).")
+        return
+    checkpoint_file = output + ".checkpoint.json"
+
+    print("Connecting to database...")
+    db = Database(config.DB_CONFIG)
+    try:
+        checkpoint = load_json(checkpoint_file) if resume else None
+        if checkpoint:
+            compression = checkpoint["compression"]
+            print(f"Resuming {output} after id {checkpoint['last_id']} ({checkpoint['rows']} rows written).")
+        else:
+            since = None
+            if incremental:
+                state = load_json(state_file)
+                if not state:
+                    print(f"No previous snapshot recorded in {state_file}; run a full export first.")
+                    return
+                since = (datetime.fromisoformat(state["snapshot_at"]) - INCREMENTAL_OVERLAP).isoformat()
+            checkpoint = {
+                "compression": compression,
+                "since": since,
+                # Taken before reading, so the next incremental export starts
+                # no later than anything this one could have missed.
+                "snapshot_at": db.fetch_now().isoformat(),
+                "last_id": 0,
+                "rows": 0,
+                "offset": 0,
+            }
+            save_json(checkpoint_file, checkpoint)
+
+        mode = f"rows changed since {checkpoint['since']}" if checkpoint["since"] else "all rows"
+        print(f"Exporting {mode} to {output} ({checkpoint['compression']})...")
+
+        with open(output, "r+b" if os.path.exists(output) else "wb") as raw:
+            # Drop whatever was written after the last checkpoint.
+            raw.truncate(checkpoint["offset"])
+            raw.seek(checkpoint["offset"])
+
+            def commit_frame(frame, last_id, rows):
+                frame.close()
+                raw.flush()
+                os.fsync(raw.fileno())
+                checkpoint.update(last_id=last_id, rows=rows, offset=raw.tell())
+                save_json(checkpoint_file, checkpoint)
+
+            frame = open_frame(raw, compression)
+            pending = 0
+            last_id, rows = checkpoint["last_id"], checkpoint["rows"]
+            for row_id, line in db.iter_profiles_for_export(last_id, checkpoint["since"], fetch_size):
+                frame.write(line.encode("utf-8") + b"\n")
+                last_id, rows, pending = row_id, rows + 1, pending + 1
+                if pending >= checkpoint_every:
+                    commit_frame(frame, last_id, rows)
+                    print(f"  {rows} rows written (through id {last_id})")
+                    frame, pending = open_frame(raw, compression), 0
+
+            # Tombstones go in the last frame; a crash here redoes just this frame.
+            deleted = 0
+            if checkpoint["since"]:
+                for row_id, line in db.iter_deleted_for_export(checkpoint["since"]):
+                    frame.write(line.encode("utf-8") + b"\n")
+                    deleted += 1
+            commit_frame(frame, last_id, rows)
+
+        save_json(state_file, {"snapshot_at": checkpoint["snapshot_at"], "output": output})
+        os.remove(checkpoint_file)
+        print(f"Snapshot completed: {rows} rows{f' and {deleted} deletions' if deleted else ''} "
+              f"written to {output} ({os.path.getsize(output)} bytes).")
+    except Exception as e:
+        print(f"An error occurred during export: {e}")
+        print("Re-run with --resume to continue from the last checkpoint.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export cv_profiles to compressed NDJSON, one row per line in id order.")
+    parser.add_argument("output", help="File to write, e.g. cv_profiles.ndjson.gz.")
+    parser.add_argument("--compression", choices=("gzip", "zstd"), default="gzip")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only export rows changed (and ids deleted) since the last completed snapshot.")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted export of the same output file.")
+    parser.add_argument("--state-file", default=DEFAULT_STATE_FILE, help="Where the time of the last completed snapshot is kept.")
+    parser.add_argument("--checkpoint-every", type=int, default=10000, help="Rows written between checkpoints.")
+    parser.add_argument("--fetch-size", type=int, default=2000, help="Rows fetched per round trip from the server-side cursor.")
+    args = parser.parse_args()
+    export_snapshot(args.output, args.compression, args.incremental, args.resume, args.state_file,
+                    args.checkpoint_every, args.fetch_size)
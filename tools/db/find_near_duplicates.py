@@ -0,0 +1,118 @@
+import argparse
+import json
+import sys
+import os
+import psycopg2
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'server')))
+
+from db_utils import Database
+from dedup_utils import cv_features, minhash_signature, near_duplicate_clusters
+import config
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS cv_profiles_minhash (
+    id INTEGER PRIMARY KEY REFERENCES cv_profiles (id) ON DELETE CASCADE,
+    signature BIGINT[] NOT NULL
+);
+
+-- A signature is only valid for the data it was computed from; dropping it
+-- on change makes the next run recompute just that row.
+CREATE OR REPLACE FUNCTION cv_profiles_minhash_invalidate() RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM cv_profiles_minhash WHERE id = OLD.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS cv_profiles_minhash_invalidate ON cv_profiles;
+CREATE TRIGGER cv_profiles_minhash_invalidate
+    AFTER UPDATE OF data ON cv_profiles
+    FOR EACH ROW WHEN (OLD.data IS DISTINCT FROM NEW.data)
+    EXECUTE FUNCTION cv_profiles_minhash_invalidate();
+"""
+
+def create_schema():
+    conn = psycopg2.connect(**config.DB_CONFIG)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SCHEMA_SQL)
+        conn.commit()
+    finally:
+        conn.close()
+
+def update_signatures(db, batch_size):
+    batch = []
+    total = 0
+    for row_id, data in db.iter_rows_missing_minhash(fetch_size=batch_size):
+        batch.append((row_id, minhash_signature(cv_features(data))))
+        if len(batch) >= batch_size:
+            db.save_minhash_signatures(batch)
+            total += len(batch)
+            print(f"  {total} signatures computed...")
+            batch = []
+    if batch:
+        db.save_minhash_signatures(batch)
+        total += len(batch)
+    print(f"Computed {total} new or changed signatures.")
+
+def build_report(db, threshold):
+    clusters = near_duplicate_clusters(db.iter_minhash_signatures(), threshold=threshold)
+    ids = [row_id for keep, members in clusters for row_id in [keep, *members]]
+    names = {row_id: summary['candidate']['fullName'] for row_id, summary in db.fetch_candidates_by_ids(ids)}
+
+    # Suggest keeping the oldest row, like remove_duplicates does.
+    return [
+        {
+            "keep": keep,
+            "delete": list(members),
+            "members": [{"id": keep, "fullName": names.get(keep), "similarity": 1.0}] + [
+                {"id": row_id, "fullName": names.get(row_id), "similarity": round(similarity, 3)}
+                for row_id, similarity in members.items()
+            ],
+        }
+        for keep, members in clusters
+    ]
+
+def print_report(report):
+    for cluster in report:
+        print(f"Cluster keeping {cluster['keep']}:")
+        for member in cluster["members"]:
+            label = "keep" if member["id"] == cluster["keep"] else f"{member['similarity']:.2f}"
+            print(f"  {member['id']:>8}  {label:>6}  {member['fullName']}")
+    print(f"{len(report)} clusters, {sum(len(c['delete']) for c in report)} rows suggested for deletion.")
+
+def apply_report(db, path):
+    with open(path, "r") as f:
+        report = json.load(f)
+    ids = [row_id for cluster in report for row_id in cluster["delete"]]
+    deleted = db.delete_candidates(ids)
+    print(f"Deleted {len(deleted)} of {len(ids)} rows listed in {path}.")
+
+def find_near_duplicates(threshold, batch_size, output, apply):
+    print("Connecting to database...")
+    db = Database(config.DB_CONFIG)
+    try:
+        if apply:
+            apply_report(db, apply)
+            return
+        create_schema()
+        update_signatures(db, batch_size)
+        report = build_report(db, threshold)
+        print_report(report)
+        if output:
+            with open(output, "w") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            print(f"Report written to {output}. Edit it if needed, then run with --apply {output}.")
+    except Exception as e:
+        print(f"An error occurred during near-duplicate detection: {e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find near-duplicate CVs with MinHash/LSH and report them for review.")
+    parser.add_argument("--threshold", type=float, default=0.6, help="Minimum estimated Jaccard similarity (0-1) to report a pair.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Signatures computed and stored per batch.")
+    parser.add_argument("--output", help="Write the review report to this JSON file.")
+    parser.add_argument("--apply", metavar="REPORT", help="Delete the 'delete' ids of a reviewed report instead of searching.")
+    args = parser.parse_args()
+    find_near_duplicates(args.threshold, args.batch_size, args.output, args.apply)
@@ -0,0 +1,154 @@
+import argparse
+import json
+import sys
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# Add the server directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'server')))
+
+from db_utils import Database
+import config
+
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+LINES_PER_TASK = 2000
+FILES_PER_TASK = 200
+
+def to_row(record, source, file_name):
+    """Turn one record into an (id, source, source_file_name, data_json) row.
+
+    A record is either a cv_profiles row ({"id"?, "data", "source"?,
+    "source_file_name"?}) or a bare CV document, which becomes its data.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("record is not a JSON object")
+    if "data" in record:
+        row_id = record.get("id")
+        if row_id is not None and not isinstance(row_id, int):
+            raise ValueError(f"id must be an integer, got {row_id!r}")
+        source = record.get("source") or source
+        file_name = record.get("source_file_name") or file_name
+        data = record["data"]
+    else:
+        row_id, data = None, record
+    data_json = json.dumps(data, ensure_ascii=False)
+    if "\\u0000" in data_json:
+        raise ValueError("jsonb cannot store \\u0000")
+    return (row_id, source, file_name, data_json)
+
+def parse_task(task):
+    """Parse one unit of work in a worker process; returns (rows, errors)."""
+    kind, source, payload = task
+    rows, errors = [], []
+    if kind == "lines":
+        file_name, first_line, lines = payload
+        for offset, line in enumerate(lines):
+            if not line.strip():
+                continue
+            try:
+                # Every line is its own CV, so the file's name would make
+                # --skip-existing-files keep only the first; a line is only
+                # deduplicated by a source_file_name it carries itself.
+                rows.append(to_row(json.loads(line), source, None))
+            except ValueError as e:
+                errors.append(f"{file_name}:{first_line + offset}: {e}")
+    else:
+        for path in payload:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    rows.append(to_row(json.load(f), source, os.path.basename(path)))
+            except (OSError, ValueError) as e:
+                errors.append(f"{path}: {e}")
+    return rows, errors
+
+def iter_tasks(paths, source):
+    json_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".json"):
+                    json_files.append(os.path.join(path, name))
+                elif name.endswith(NDJSON_SUFFIXES):
+                    yield from iter_line_tasks(os.path.join(path, name), source)
+        elif path.endswith(NDJSON_SUFFIXES) or path == "-":
+            yield from iter_line_tasks(path, source)
+        else:
+            json_files.append(path)
+    for i in range(0, len(json_files), FILES_PER_TASK):
+        yield ("files", source, json_files[i:i + FILES_PER_TASK])
+
+def iter_line_tasks(path, source):
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        lines, first_line = [], 1
+        for line_no, line in enumerate(f, start=1):
+            lines.append(line)
+            if len(lines) >= LINES_PER_TASK:
+                yield ("lines", source, (path, first_line, lines))
+                lines, first_line = [], line_no + 1
+        if lines:
+            yield ("lines", source, (path, first_line, lines))
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def parse_in_order(pool, tasks, window):
+    """Yield parse_task results in task order, with at most window tasks
+    submitted at a time, so input is read only as fast as it is loaded."""
+    pending = deque(pool.submit(parse_task, task) for task in islice(tasks, window))
+    while pending:
+        result = pending.popleft().result()
+        for task in islice(tasks, 1):
+            pending.append(pool.submit(parse_task, task))
+        yield result
+
+def ingest(paths, batch_size, workers, source, skip_existing_files):
+    print("Connecting to database...")
+    db = Database(config.DB_CONFIG)
+    start = time.monotonic()
+    inserted = updated = failed = 0
+    batch = []
+
+    def flush():
+        nonlocal inserted, updated, batch
+        batch_inserted, batch_updated = db.copy_upsert_profiles(batch, skip_existing_files=skip_existing_files)
+        inserted += batch_inserted
+        updated += batch_updated
+        elapsed = time.monotonic() - start
+        print(f"  {inserted} inserted, {updated} updated ({(inserted + updated) / elapsed:.0f} rows/s)")
+        batch = []
+
+    try:
+        # Workers only parse; rows are loaded in order from this process, one
+        # transaction per batch, so an interrupted run keeps whole batches.
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for rows, errors in parse_in_order(pool, iter_tasks(paths, source), workers * 2):
+                for error in errors:
+                    print(f"  skipped {error}")
+                failed += len(errors)
+                batch.extend(rows)
+                while len(batch) >= batch_size:
+                    rest = batch[batch_size:]
+                    batch = batch[:batch_size]
+                    flush()
+                    batch = rest
+        if batch:
+            flush()
+        print(f"Ingestion completed in {time.monotonic() - start:.1f}s: "
+              f"{inserted} inserted, {updated} updated, {failed} skipped.")
+    except Exception as e:
+        print(f"An error occurred during ingestion: {e}")
+        print(f"Batches committed before the error: {inserted} inserted, {updated} updated.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load CVs into cv_profiles with COPY and a set-based upsert.")
+    parser.add_argument("paths", nargs="+", help="NDJSON files (.ndjson/.jsonl, '-' for stdin), JSON files, or directories of them.")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows loaded per COPY and transaction.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes used to parse input files.")
+    parser.add_argument("--source", default="bulk_ingest", help="source value for records that do not set one.")
+    parser.add_argument("--skip-existing-files", action="store_true", help="Skip records without an id whose source_file_name is already loaded (or earlier in the input).")
+    args = parser.parse_args()
+    ingest(args.paths, args.batch_size, args.workers, args.source, args.skip_existing_files)
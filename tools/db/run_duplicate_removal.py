@@ -1,21 +1,82 @@
+import argparse
+import json
 import sys
 import os
+import time
+import psycopg2.errors
 
 # Add the server directory to the Python path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'server')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'server')))
 
 from db_utils import Database
 import config
 
-def run_duplicate_removal():
+DEFAULT_CHECKPOINT_FILE = os.path.join(os.path.dirname(__file__), "duplicate_removal_checkpoint.json")
+
+def load_checkpoint(path):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f).get("last_id", 0)
+    return 0
+
+def save_checkpoint(path, last_id):
+    with open(path, "w") as f:
+        json.dump({"last_id": last_id}, f)
+
+def run_duplicate_removal(batch_size, dry_run, resume, checkpoint_file, lock_timeout_ms, pause, max_retries):
     print("Connecting to database...")
     db = Database(config.DB_CONFIG)
-    print("Database connection established. Removing duplicates...")
     try:
-        db.remove_duplicates()
-        print("Duplicate removal process completed.")
+        max_id = db.fetch_max_id()
+        # Dry runs never move the checkpoint, so they always start from the top.
+        low = load_checkpoint(checkpoint_file) if resume and not dry_run else 0
+        if low:
+            print(f"Resuming after id {low}.")
+        mode = "Dry run: reporting" if dry_run else "Removing"
+        print(f"{mode} duplicates in ids {low + 1}..{max_id}, {batch_size} ids per batch...")
+
+        total = 0
+        while low < max_id:
+            high = min(low + batch_size, max_id)
+            for attempt in range(max_retries + 1):
+                try:
+                    rows = db.remove_duplicates_batch(low, high, dry_run=dry_run, lock_timeout_ms=lock_timeout_ms)
+                    break
+                except psycopg2.errors.LockNotAvailable:
+                    if attempt == max_retries:
+                        raise
+                    print(f"  ids {low + 1}..{high}: lock not granted, retrying ({attempt + 1}/{max_retries})...")
+                    time.sleep(pause * (attempt + 1) or 1)
+
+            for row_id, kept_id, full_name in rows:
+                if dry_run:
+                    print(f"  would delete {row_id} (duplicate of {kept_id}, {full_name!r})")
+            total += len(rows)
+            if not dry_run:
+                save_checkpoint(checkpoint_file, high)
+            print(f"  ids {low + 1}..{high}: {len(rows)} {'found' if dry_run else 'deleted'} "
+                  f"({total} total, {high * 100 // max_id}% done)")
+            low = high
+            if pause:
+                time.sleep(pause)
+
+        if not dry_run and os.path.exists(checkpoint_file):
+            os.remove(checkpoint_file)
+        print(f"Duplicate removal process completed: {total} {'would be deleted' if dry_run else 'deleted'}.")
     except Exception as e:
         print(f"An error occurred during duplicate removal: {e}")
+        if not dry_run:
+            print("Re-run with --resume to continue from the last completed batch.")
 
 if __name__ == "__main__":
-    run_duplicate_removal()
+    parser = argparse.ArgumentParser(description="Remove cv_profiles rows whose fullName already exists with a smaller id.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Number of ids checked per transaction.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report the ids that would be deleted.")
+    parser.add_argument("--resume", action="store_true", help="Continue after the last batch recorded in the checkpoint file.")
+    parser.add_argument("--checkpoint-file", default=DEFAULT_CHECKPOINT_FILE, help="Where progress is recorded between batches.")
+    parser.add_argument("--lock-timeout-ms", type=int, default=2000, help="Give up on a batch if its row locks take longer than this.")
+    parser.add_argument("--pause", type=float, default=0.1, help="Seconds to sleep between batches to spread out WAL and I/O.")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retries per batch after a lock timeout.")
+    args = parser.parse_args()
+    run_duplicate_removal(args.batch_size, args.dry_run, args.resume, args.checkpoint_file,
+                          args.lock_timeout_ms, args.pause, args.max_retries)